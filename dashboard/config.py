@@ -40,6 +40,8 @@ DATE_RANGE_PRESETS = [
 CHART_HEIGHT = 500
 CHART_HEIGHT_LARGE = 600
 CHART_MARGIN = dict(l=50, r=50, t=50, b=50)
+MAX_CHART_POINTS = 2000  # Longer trend series are downsampled
+MAX_TABLE_ROWS = 500  # Rows shown in detailed statistics tables
 
 # Format strings
 CURRENCY_FORMAT = "฿{:,.2f}"
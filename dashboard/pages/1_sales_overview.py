@@ -1,14 +1,20 @@
 # foodstory-eda/dashboard/pages/1_sales_overview.py
 
 import streamlit as st
-import plotly.express as px
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import plotly.graph_objects as go
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
 
-from utils.data_loader import load_sales_data, get_date_range
+from config import TIME_PERIODS, MAX_CHART_POINTS
+from utils.data_loader import load_sales_data, get_date_range, get_db_path
+from utils.chart_utils import downsample_series, histogram_bins
 from utils.analysis import (
     calculate_key_metrics,
+    summarize_sales,
+    aggregate_sales_summary,
     analyze_time_patterns,
     calculate_group_metrics
 )
@@ -54,78 +60,35 @@ time_period = st.sidebar.selectbox(
     index=2
 )
 
-# Load and filter data
-@st.cache_data
-def load_filtered_data(start_date, end_date):
+# Sales are only loaded on a cache miss; reruns with the same dates reuse the
+# small results keyed on the dates instead of hashing the sales frame. The
+# database mtime is part of the key, so this cache never outlives a re-ingest.
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=8)
+def load_sales_summary(start_date, end_date, db_mtime):
     df = load_sales_data(start_date, end_date)
-    return df
-
-df = load_filtered_data(date_range[0], date_range[1])
-
-# Calculate key metrics
-metrics = calculate_key_metrics(df)
-
-# Display key metrics
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.metric(
-        "Total Revenue",
-        f"฿{metrics['total_revenue']:,.0f}",
-        f"฿{metrics['avg_daily_revenue']:,.0f}/day"
-    )
-
-with col2:
-    st.metric(
-        "Total Transactions",
-        f"{metrics['total_transactions']:,}",
-        f"{metrics['avg_daily_transactions']:.1f}/day"
-    )
-
-with col3:
-    st.metric(
-        "Average Bill",
-        f"฿{metrics['avg_transaction']:,.0f}",
-        f"฿{df['summary_price'].median():,.0f} median"
-    )
-
-with col4:
-    st.metric(
-        "Average Group Size",
-        f"{metrics['avg_group_size']:.1f}",
-        f"{df['seat_amount'].median():.0f} median"
-    )
-
-# Revenue Analysis
-st.header("Revenue Analysis")
-tab1, tab2 = st.tabs(["Trend Analysis", "Time Distribution"])
-
-with tab1:
-    # Prepare data based on selected time period
-    if time_period == "Hourly":
-        df['period'] = df['datetime'].dt.floor('H')
-    elif time_period == "Daily":
-        df['period'] = df['datetime'].dt.date
-    elif time_period == "Weekly":
-        df['period'] = df['datetime'].dt.strftime('%Y-W%U')
-    else:  # Monthly
-        df['period'] = df['datetime'].dt.strftime('%Y-%m')
+    
+    # One pass over the sales; every breakdown below is derived from this summary
+    return calculate_key_metrics(df), summarize_sales(df)
 
-    trend_data = df.groupby('period').agg({
-        'summary_price': ['sum', 'mean', 'count']
-    }).reset_index()
-    trend_data.columns = ['period', 'revenue', 'avg_bill', 'transactions']
+# Figure builders; cached so reruns with unchanged data reuse the figure,
+# and a fixed uirevision lets plotly.js update it in place
+@st.cache_data(show_spinner=False)
+def build_trend_figure(trend_data, time_period):
+    # Long series are downsampled before plotting; LTTB keeps peaks and dips
+    revenue_points = downsample_series(trend_data, 'period', 'revenue', MAX_CHART_POINTS)
+    transaction_points = downsample_series(trend_data, 'period', 'transactions', MAX_CHART_POINTS)
 
+    # WebGL traces: hourly trends can run to thousands of points
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=trend_data['period'],
-        y=trend_data['revenue'],
+    fig.add_trace(go.Scattergl(
+        x=revenue_points['period'],
+        y=revenue_points['revenue'],
         name='Revenue',
         line=dict(color='#2E86C1')
     ))
-    fig.add_trace(go.Scatter(
-        x=trend_data['period'],
-        y=trend_data['transactions'] * trend_data['revenue'].mean(),
+    fig.add_trace(go.Scattergl(
+        x=transaction_points['period'],
+        y=transaction_points['transactions'] * trend_data['revenue'].mean(),
         name='Transactions',
         line=dict(color='#E67E22', dash='dot')
     ))
@@ -134,13 +97,38 @@ with tab1:
         title=f'{time_period} Revenue and Transaction Trends',
         xaxis_title='Period',
         yaxis_title='Amount (฿)',
-        hovermode='x unified'
+        hovermode='x unified',
+        uirevision='sales-trend'
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig.to_dict()
 
-with tab2:
+def build_trend(summary, time_period):
+    # Prepare data based on selected time period
+    if time_period == "Hourly":
+        period = summary['hour']
+    elif time_period == "Daily":
+        period = summary['hour'].dt.floor('D')
+    elif time_period == "Weekly":
+        period = summary['hour'].dt.to_period('W-SAT')
+    else:  # Monthly
+        period = summary['hour'].dt.to_period('M')
+
+    trend_data = aggregate_sales_summary(summary, period.rename('period'))[
+        ['total_revenue', 'avg_bill', 'transaction_count']
+    ]
+    if time_period == "Weekly":
+        trend_data.index = trend_data.index.start_time.strftime('%Y-W%U')
+    elif time_period == "Monthly":
+        trend_data.index = trend_data.index.strftime('%Y-%m')
+    trend_data = trend_data.reset_index()
+    trend_data.columns = ['period', 'revenue', 'avg_bill', 'transactions']
+
+    return build_trend_figure(trend_data, time_period)
+
+def build_time_distribution(summary, time_period):
     # Time distribution analysis
-    time_patterns = analyze_time_patterns(df, time_period.lower())
+    period_keys = {label: key for key, label in TIME_PERIODS.items()}
+    time_patterns = analyze_time_patterns(summary, period_keys[time_period])
     time_patterns = time_patterns.reset_index()
     time_patterns.columns = ['period', 'transaction_count', 'total_revenue', 'avg_bill', 'avg_group_size']
     
@@ -170,27 +158,39 @@ with tab2:
         ),
         hovermode='x unified'
     )
-    st.plotly_chart(fig, use_container_width=True)
-
-# Group Size Analysis
-st.header("Group Size Analysis")
-col1, col2 = st.columns(2)
+    return fig
 
-with col1:
-    # Group size distribution
-    fig = px.histogram(
-        df,
-        x='seat_amount',
-        nbins=20,
+def build_group_size_distribution(summary):
+    # Group size distribution, binned from the per-seat visit counts
+    centers, widths, counts = histogram_bins(
+        summary['seat_amount'], bins=20, weights=summary['transactions']
+    )
+    fig = go.Figure(go.Bar(x=centers, y=counts, width=widths, marker_color='#2E86C1'))
+    fig.update_layout(
         title='Distribution of Group Sizes',
-        labels={'seat_amount': 'Group Size', 'count': 'Number of Visits'}
+        xaxis_title='Group Size',
+        yaxis_title='Number of Visits'
     )
-    fig.update_traces(marker_color='#2E86C1')
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-with col2:
+@st.cache_data(show_spinner=False)
+def build_monthly_stats(summary):
+    # Monthly statistics, keyed on integer periods rather than formatted strings
+    monthly_stats = aggregate_sales_summary(
+        summary, summary['hour'].dt.to_period('M').rename('month')
+    ).round(2)
+    
+    monthly_stats.index = monthly_stats.index.strftime('%Y-%m')
+    monthly_stats = monthly_stats.reset_index()
+    
+    # Calculate growth rates
+    monthly_stats['revenue_growth'] = monthly_stats['total_revenue'].pct_change() * 100
+    monthly_stats['transaction_growth'] = monthly_stats['transaction_count'].pct_change() * 100
+    return monthly_stats
+
+def build_group_revenue(summary):
     # Revenue by group size
-    group_metrics = calculate_group_metrics(df)
+    group_metrics = calculate_group_metrics(summary)
     
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -218,35 +218,97 @@ with col2:
         ),
         hovermode='x unified'
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+# Key metrics and the hourly summary for the selected dates
+metrics, summary = load_sales_summary(date_range[0], date_range[1],
+                                      get_db_path().stat().st_mtime)
+
+if metrics['total_transactions'] == 0:
+    st.warning("No sales in the selected date range")
+    st.stop()
+
+# Display key metrics
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric(
+        "Total Revenue",
+        f"฿{metrics['total_revenue']:,.0f}",
+        f"฿{metrics['avg_daily_revenue']:,.0f}/day"
+    )
+
+with col2:
+    st.metric(
+        "Total Transactions",
+        f"{metrics['total_transactions']:,}",
+        f"{metrics['avg_daily_transactions']:.1f}/day"
+    )
+
+with col3:
+    st.metric(
+        "Average Bill",
+        f"฿{metrics['avg_transaction']:,.0f}",
+        f"฿{metrics['median_bill']:,.0f} median"
+    )
+
+with col4:
+    st.metric(
+        "Average Group Size",
+        f"{metrics['avg_group_size']:.1f}",
+        f"{metrics['median_group_size']:.0f} median"
+    )
+
+# Build the independent figures concurrently; their aggregations run in
+# pandas/NumPy code that releases the GIL. Workers get this script's context
+# so cached functions work, while all rendering stays on the main thread.
+ctx = get_script_run_ctx()
+with ThreadPoolExecutor(
+    max_workers=4,
+    initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+) as executor:
+    trend_fig = executor.submit(build_trend, summary, time_period)
+    distribution_fig = executor.submit(build_time_distribution, summary, time_period)
+    group_size_fig = executor.submit(build_group_size_distribution, summary)
+    group_revenue_fig = executor.submit(build_group_revenue, summary)
+
+# Revenue Analysis
+st.header("Revenue Analysis")
+tab1, tab2 = st.tabs(["Trend Analysis", "Time Distribution"])
+
+with tab1:
+    st.plotly_chart(trend_fig.result(), use_container_width=True)
+
+with tab2:
+    st.plotly_chart(distribution_fig.result(), use_container_width=True)
+
+# Group Size Analysis
+st.header("Group Size Analysis")
+col1, col2 = st.columns(2)
+
+with col1:
+    st.plotly_chart(group_size_fig.result(), use_container_width=True)
+
+with col2:
+    st.plotly_chart(group_revenue_fig.result(), use_container_width=True)
 
 # Detailed Statistics
 st.header("Detailed Statistics")
 with st.expander("View Detailed Statistics"):
-    # Monthly statistics
-    monthly_stats = df.groupby(df['datetime'].dt.strftime('%Y-%m')).agg({
-        'summary_price': ['count', 'sum', 'mean'],
-        'seat_amount': ['mean', 'sum']
-    }).round(2)
-    
-    monthly_stats.columns = [
-        'transaction_count', 'total_revenue', 'avg_bill',
-        'avg_group_size', 'total_seats'
-    ]
-    monthly_stats = monthly_stats.reset_index()
-    
-    # Calculate growth rates
-    monthly_stats['revenue_growth'] = monthly_stats['total_revenue'].pct_change() * 100
-    monthly_stats['transaction_growth'] = monthly_stats['transaction_count'].pct_change() * 100
-    
-    st.subheader("Monthly Performance")
-    st.dataframe(
-        monthly_stats.style.format({
-            'total_revenue': '฿{:,.2f}',
-            'avg_bill': '฿{:,.2f}',
-            'avg_group_size': '{:.1f}',
-            'revenue_growth': '{:+.1f}%',
-            'transaction_growth': '{:+.1f}%'
-        }),
-        hide_index=True
-    )
\ No newline at end of file
+    # Expander contents run even while collapsed, so the statistics are
+    # only computed once the user asks for them
+    if st.checkbox("Show monthly statistics", key='show_monthly_stats'):
+        monthly_stats = build_monthly_stats(summary)
+        
+        st.subheader("Monthly Performance")
+        st.dataframe(
+            monthly_stats,
+            column_config={
+                'total_revenue': st.column_config.NumberColumn(format='฿%,.2f'),
+                'avg_bill': st.column_config.NumberColumn(format='฿%,.2f'),
+                'avg_group_size': st.column_config.NumberColumn(format='%.1f'),
+                'revenue_growth': st.column_config.NumberColumn(format='%+.1f%%'),
+                'transaction_growth': st.column_config.NumberColumn(format='%+.1f%%')
+            },
+            hide_index=True
+        )
\ No newline at end of file
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import pandas as pd
 import sqlite3
 
+from config import MAX_TABLE_ROWS
 from utils.data_loader import (
     load_menu_data,
     get_date_range,
@@ -14,6 +15,7 @@ from utils.data_loader import (
     load_category_summary,
     load_monthly_trends
 )
+from utils.chart_utils import histogram_bins, render_styled_table
 from utils.analysis import (
     analyze_menu_performance,
     analyze_category_trends,
@@ -43,16 +45,55 @@ date_range = st.sidebar.date_input(
 categories = ['All'] + get_categories()
 selected_category = st.sidebar.selectbox("Select Category", categories)
 
-# Load and filter data
-@st.cache_data
+# Load and filter data; load_menu_data caches the query itself, while a
+# failed load comes back empty, uncached and without any columns
 def load_filtered_menu_data(start_date, end_date, category):
     df = load_menu_data(start_date, end_date)
-    if category != 'All':
+    if category != 'All' and not df.empty:
         df = df[df['category'] == category]
     return df
 
 df = load_filtered_menu_data(date_range[0], date_range[1], selected_category)
 
+if df.empty:
+    st.warning("No menu sales in the selected date range")
+    st.stop()
+
+# Figure builders; cached so reruns with unchanged data reuse the figure,
+# and a fixed uirevision lets plotly.js update it in place
+@st.cache_data(show_spinner=False)
+def build_top_items_figure(top_items):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=top_items['menu_name'],
+        y=top_items['revenue'],
+        name='Revenue',
+        marker_color='#2E86C1'
+    ))
+    fig.add_trace(go.Scatter(
+        x=top_items['menu_name'],
+        y=top_items['quantity'],
+        name='Quantity Sold',
+        yaxis='y2',
+        line=dict(color='#E67E22')
+    ))
+
+    fig.update_layout(
+        title='Top 20 Menu Items by Revenue',
+        xaxis_title='Menu Item',
+        yaxis_title='Revenue (฿)',
+        yaxis2=dict(
+            title='Quantity Sold',
+            overlaying='y',
+            side='right'
+        ),
+        showlegend=True,
+        height=600,
+        uirevision='top-items'
+    )
+    fig.update_xaxes(tickangle=45)
+    return fig.to_dict()
+
 # Logging raw data issues
 # st.write("Debug: Raw data shape:", df.shape)
 # st.write("Debug: Data columns:", df.columns.tolist())
@@ -105,54 +146,28 @@ st.header("Menu Performance Analysis")
 # st.write("Debug: Menu performance shape:", menu_perf.shape)
 # st.write("Debug: Menu performance columns:", menu_perf.columns.tolist())
 
+# Menu performance metrics, shared by the top items tab and the detailed statistics
+menu_perf = analyze_menu_performance(df, min_orders=5)
+
 tab1, tab2, tab3 = st.tabs(["Top Items", "Category Analysis", "Trend Analysis"])
 
 with tab1:
-    # Get menu performance metrics
-    menu_perf = analyze_menu_performance(df)
     top_items = menu_perf.nlargest(20, 'revenue')
     
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=top_items['menu_name'],
-        y=top_items['revenue'],
-        name='Revenue',
-        marker_color='#2E86C1'
-    ))
-    fig.add_trace(go.Scatter(
-        x=top_items['menu_name'],
-        y=top_items['quantity'],
-        name='Quantity Sold',
-        yaxis='y2',
-        line=dict(color='#E67E22')
-    ))
-
-    fig.update_layout(
-        title='Top 20 Menu Items by Revenue',
-        xaxis_title='Menu Item',
-        yaxis_title='Revenue (฿)',
-        yaxis2=dict(
-            title='Quantity Sold',
-            overlaying='y',
-            side='right'
-        ),
-        showlegend=True,
-        height=600
-    )
-    fig.update_xaxes(tickangle=45)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_top_items_figure(top_items), use_container_width=True)
 
     # Show detailed metrics
     st.subheader("Top Items Details")
     detailed_view = top_items[['menu_name', 'category', 'quantity', 'revenue',
                               'avg_price', 'revenue_share', 'discount_rate']]
     st.dataframe(
-        detailed_view.style.format({
-            'revenue': '฿{:,.2f}',
-            'avg_price': '฿{:,.2f}',
-            'revenue_share': '{:.1f}%',
-            'discount_rate': '{:.1f}%'
-        }),
+        detailed_view,
+        column_config={
+            'revenue': st.column_config.NumberColumn(format='฿%,.2f'),
+            'avg_price': st.column_config.NumberColumn(format='฿%,.2f'),
+            'revenue_share': st.column_config.NumberColumn(format='%.1f%%'),
+            'discount_rate': st.column_config.NumberColumn(format='%.1f%%')
+        },
         hide_index=True
     )
 
@@ -181,12 +196,13 @@ with tab2:
     cat_summary['discount_rate'] = cat_summary['total_discount'] / cat_summary['total_revenue'] * 100
     
     st.dataframe(
-        cat_summary.style.format({
-            'total_revenue': '฿{:,.2f}',
-            'total_discount': '฿{:,.2f}',
-            'avg_revenue_per_item': '฿{:,.2f}',
-            'discount_rate': '{:.1f}%'
-        }),
+        cat_summary,
+        column_config={
+            'total_revenue': st.column_config.NumberColumn(format='฿%,.2f'),
+            'total_discount': st.column_config.NumberColumn(format='฿%,.2f'),
+            'avg_revenue_per_item': st.column_config.NumberColumn(format='฿%,.2f'),
+            'discount_rate': st.column_config.NumberColumn(format='%.1f%%')
+        },
         hide_index=True
     )
 
@@ -204,7 +220,7 @@ with tab3:
     fig = go.Figure()
     for cat in df['category'].unique():
         cat_data = trends[trends['category'] == cat]
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=cat_data['datetime'],
             y=cat_data['revenue'],
             name=cat,
@@ -217,7 +233,8 @@ with tab3:
         yaxis_title='Revenue (฿)',
         height=500,
         showlegend=True,
-        hovermode='x unified'
+        hovermode='x unified',
+        uirevision='category-trend'
     )
     st.plotly_chart(fig, use_container_width=True)
     
@@ -229,10 +246,11 @@ with tab3:
         values='revenue_growth'
     ).fillna(0)
     
-    st.dataframe(
-        growth_data.style.format('{:+.1f}%')
-                      .background_gradient(cmap='RdYlGn', vmin=-20, vmax=20),
-        height=400
+    st.markdown(
+        render_styled_table(growth_data, '{:+.1f}%',
+                            gradient=dict(cmap='RdYlGn', vmin=-20, vmax=20),
+                            height=400),
+        unsafe_allow_html=True
     )
 
 # Menu Combinations Analysis
@@ -240,11 +258,11 @@ st.header("Menu Combinations Analysis")
 
 # Find popular combinations
 combinations = find_top_combinations(df)
-combinations = combinations.sort_values('count', ascending=False).head(20)
+combinations = combinations.nlargest(20, 'count')
 
 fig = go.Figure(data=[
     go.Bar(
-        x=[f"{row['item1']} + {row['item2']}" for _, row in combinations.iterrows()],
+        x=combinations['item1'] + ' + ' + combinations['item2'],
         y=combinations['count'],
         marker_color='#2E86C1'
     )
@@ -267,12 +285,15 @@ with col1:
     # Distribution of discount rates
     discount_data = df[df['discount_amount'] > 0]
     if not discount_data.empty:
-        fig = px.histogram(
-            discount_data,
-            x=discount_data['discount_amount'] / discount_data['revenue'] * 100,
-            nbins=30,
+        # Binned here so only the bin counts are sent to the browser
+        centers, widths, counts = histogram_bins(
+            discount_data['discount_amount'] / discount_data['revenue'] * 100, bins=30
+        )
+        fig = go.Figure(go.Bar(x=centers, y=counts, width=widths))
+        fig.update_layout(
             title='Distribution of Discount Rates',
-            labels={'x': 'Discount Rate (%)', 'y': 'Count'}
+            xaxis_title='Discount Rate (%)',
+            yaxis_title='Count'
         )
         st.plotly_chart(fig, use_container_width=True)
     else:
@@ -285,7 +306,7 @@ with col2:
         fig = px.bar(
             discount_by_cat,
             x='category',
-            y=('discount_amount', 'sum'),
+            y='total_discount',
             title='Total Discounts by Category',
             labels={'x': 'Category', 'y': 'Total Discount (฿)'}
         )
@@ -297,18 +318,20 @@ with col2:
 # Detailed Menu Statistics
 st.header("Detailed Menu Statistics")
 with st.expander("View Detailed Menu Statistics"):
-    # Show full menu performance data
-    st.subheader("Menu Item Performance")
-    menu_stats = analyze_menu_performance(df, min_orders=5)
-    menu_stats = menu_stats.sort_values('revenue', ascending=False)
+    # Expander contents run even while collapsed, so the statistics are
+    # only computed once the user asks for them
+    if st.checkbox("Show menu item statistics", key='show_menu_stats'):
+        # Show full menu performance data
+        st.subheader("Menu Item Performance")
+        menu_stats = menu_perf.nlargest(MAX_TABLE_ROWS, 'revenue')
     
-    st.dataframe(
-        menu_stats.style.format({
-            'revenue': '฿{:,.2f}',
-            'discount_amount': '฿{:,.2f}',
-            'avg_price': '฿{:,.2f}',
-            'revenue_share': '{:.2f}%',
-            'discount_rate': '{:.2f}%'
-        }).background_gradient(subset=['revenue_share'], cmap='Blues'),
-        height=400
-    )
\ No newline at end of file
+        st.markdown(
+            render_styled_table(menu_stats, {
+                'revenue': '฿{:,.2f}',
+                'discount_amount': '฿{:,.2f}',
+                'avg_price': '฿{:,.2f}',
+                'revenue_share': '{:.2f}%',
+                'discount_rate': '{:.2f}%'
+            }, gradient=dict(subset=['revenue_share'], cmap='Blues'), height=400),
+            unsafe_allow_html=True
+        )
\ No newline at end of file
@@ -1,10 +1,15 @@
 # foodstory-eda/dashboard/utils/analysis.py
 
 from typing import Dict, Tuple, List
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
 
+# Weekday labels in dt.dayofweek order
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+@st.cache_data(show_spinner=False, max_entries=16)
 def calculate_key_metrics(df: pd.DataFrame) -> Dict[str, float]:
     """
     Calculate key business metrics from sales data.
@@ -15,79 +20,162 @@ def calculate_key_metrics(df: pd.DataFrame) -> Dict[str, float]:
     Returns:
         Dictionary of key metrics
     """
-    days = (df['datetime'].max() - df['datetime'].min()).days + 1
+    # Reduce each column once on the raw arrays; NaN/NaT are skipped as
+    # pandas would
+    price = df['summary_price'].to_numpy(dtype=float)
+    seats = df['seat_amount'].to_numpy(dtype=float)
+    timestamps = df['datetime'].to_numpy()
+    
+    n = len(df)
+    priced = np.count_nonzero(~np.isnan(price))
+    seated = np.count_nonzero(~np.isnan(seats))
+    total_revenue = np.nansum(price)
+    total_seats = np.nansum(seats)
+    
+    # An empty selection has no date span; report zeros instead of raising
+    days = (np.nanmax(timestamps) - np.nanmin(timestamps)) // np.timedelta64(1, 'D') + 1 if n else 1
     
     return {
-        'total_revenue': df['summary_price'].sum(),
-        'avg_daily_revenue': df['summary_price'].sum() / days,
-        'total_transactions': len(df),
-        'avg_daily_transactions': len(df) / days,
-        'avg_transaction': df['summary_price'].mean(),
-        'avg_group_size': df['seat_amount'].mean(),
-        'total_customers': (df['seat_amount'] * len(df)).sum()
+        'total_revenue': total_revenue,
+        'avg_daily_revenue': total_revenue / days,
+        'total_transactions': n,
+        'avg_daily_transactions': n / days,
+        'avg_transaction': total_revenue / priced if priced else 0.0,
+        'avg_group_size': total_seats / seated if seated else 0.0,
+        'total_customers': total_seats,
+        'median_bill': np.nanmedian(price) if priced else 0.0,
+        'median_group_size': np.nanmedian(seats) if seated else 0.0
     }
 
-def analyze_time_patterns(df: pd.DataFrame, 
+@st.cache_data(show_spinner=False, max_entries=16)
+def summarize_sales(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pre-aggregate sales by hour and group size in a single pass.
+    
+    Trends, time patterns, group size metrics and monthly statistics are all
+    derived from this much smaller frame instead of re-scanning the sales.
+    
+    Args:
+        df: Sales DataFrame
+    
+    Returns:
+        DataFrame with revenue and transaction totals per hour and seat_amount
+    """
+    return df.groupby(
+        [df['datetime'].dt.floor('h').rename('hour'), 'seat_amount'],
+        dropna=False, sort=False
+    ).agg(
+        revenue=('summary_price', 'sum'),
+        transactions=('summary_price', 'count')
+    ).reset_index()
+
+def aggregate_sales_summary(summary: pd.DataFrame, key) -> pd.DataFrame:
+    """
+    Roll the hourly sales summary up to any grouping key.
+    
+    Args:
+        summary: Output of summarize_sales
+        key: Column name or Series to group by. Categorical keys keep
+            their unused categories as empty rows.
+    
+    Returns:
+        DataFrame with transaction_count, total_revenue, avg_bill,
+        avg_group_size and total_seats per key
+    """
+    seats = summary['seat_amount'].astype(float)
+    result = summary.assign(
+        seated=summary['transactions'].where(seats.notna(), 0),
+        seats=(seats * summary['transactions']).fillna(0)
+    ).groupby(key, observed=False).agg(
+        transaction_count=('transactions', 'sum'),
+        total_revenue=('revenue', 'sum'),
+        seated=('seated', 'sum'),
+        total_seats=('seats', 'sum')
+    )
+    
+    result['avg_bill'] = result['total_revenue'] / result['transaction_count']
+    result['avg_group_size'] = result['total_seats'] / result['seated']
+    
+    return result[['transaction_count', 'total_revenue', 'avg_bill',
+                   'avg_group_size', 'total_seats']]
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def analyze_time_patterns(summary: pd.DataFrame, 
                         period: str = 'hour') -> pd.DataFrame:
     """
     Analyze sales patterns over different time periods.
     
     Args:
-        df: Sales DataFrame
-        period: Time period for analysis ('hour', 'day', 'month')
+        summary: Output of summarize_sales
+        period: Time period for analysis ('hour', 'day', 'week', 'month')
         
     Returns:
         DataFrame with time-based analysis
     """
+    # Weeks and months group on integer-backed periods (weeks starting on
+    # Sunday, as with %U) and are only formatted once aggregated
+    label_format = None
     if period == 'hour':
-        group_col = df['datetime'].dt.hour
+        group_col = summary['hour'].dt.hour
     elif period == 'day':
-        group_col = df['datetime'].dt.dayofweek
+        # Ordered weekday labels; days without sales still get a row
+        group_col = pd.Categorical.from_codes(
+            summary['hour'].dt.dayofweek.to_numpy(), categories=DAY_NAMES, ordered=True
+        )
     elif period == 'week':
-        group_col = df['datetime'].dt.strftime('%Y-W%U')
+        group_col = summary['hour'].dt.to_period('W-SAT')
+        label_format = '%Y-W%U'
     else:  # month
-        group_col = df['datetime'].dt.strftime('%Y-%m')
+        group_col = summary['hour'].dt.to_period('M')
+        label_format = '%Y-%m'
     
-    result = df.groupby(group_col).agg({
-        'receipt_number': 'count',  # transaction count
-        'summary_price': ['sum', 'mean'],  # revenue and average bill
-        'seat_amount': 'mean'  # average group size
-    }).round(2)
+    result = aggregate_sales_summary(summary, group_col).drop(columns='total_seats').round(2)
+    
+    if label_format:
+        result.index = result.index.start_time.strftime(label_format)
     
     return result
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def analyze_menu_performance(df: pd.DataFrame, min_orders: int = 5) -> pd.DataFrame:
     """
-    Analyze performance metrics for menu items with improved error handling.
-    """
-    try:
-        # Ensure numeric columns
-        df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(0)
-        df['revenue'] = pd.to_numeric(df['revenue'], errors='coerce').fillna(0)
-        df['discount_amount'] = pd.to_numeric(df['discount_amount'], errors='coerce').fillna(0)
-        
-        # Group by menu items
-        metrics = df.groupby(['menu_code', 'menu_name', 'category']).agg({
-            'quantity': 'sum',
-            'revenue': 'sum',
-            'discount_amount': 'sum',
-            'receipt_number': 'nunique'
-        }).reset_index()
-        
-        # Filter by minimum orders
-        metrics = metrics[metrics['receipt_number'] >= min_orders]
-        
-        # Calculate additional metrics
-        metrics['avg_price'] = metrics['revenue'] / metrics['quantity'].where(metrics['quantity'] > 0, 1)
-        total_revenue = metrics['revenue'].sum()
-        metrics['revenue_share'] = (metrics['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
-        metrics['discount_rate'] = (metrics['discount_amount'] / metrics['revenue'] * 100).where(metrics['revenue'] > 0, 0)
+    Analyze performance metrics for menu items.
+    
+    Expects numeric quantity, revenue and discount_amount columns, as
+    returned by load_menu_data.
+    
+    Args:
+        df: Menu sales DataFrame
+        min_orders: Minimum number of distinct receipts per item
         
-        return metrics
-    except Exception as e:
-        st.error(f"Error in menu performance analysis: {str(e)}")
-        return pd.DataFrame()
+    Returns:
+        DataFrame with per-item metrics
+    """
+    # Group by menu items
+    keys = ['menu_code', 'menu_name', 'category']
+    metrics = df.groupby(keys, observed=True, sort=False).agg({
+        'quantity': 'sum',
+        'revenue': 'sum',
+        'discount_amount': 'sum'
+    })
+    
+    # Distinct receipts per item from deduplicated rows, cheaper than nunique
+    orders = df[keys + ['receipt_number']].dropna().drop_duplicates()
+    metrics['receipt_number'] = orders.groupby(keys, observed=True, sort=False).size().reindex(metrics.index, fill_value=0)
+    metrics = metrics.reset_index()
+    
+    # Filter by minimum orders
+    metrics = metrics[metrics['receipt_number'] >= min_orders]
+    
+    # Calculate additional metrics
+    metrics['avg_price'] = metrics['revenue'] / metrics['quantity'].where(metrics['quantity'] > 0, 1)
+    total_revenue = metrics['revenue'].sum()
+    metrics['revenue_share'] = (metrics['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
+    metrics['discount_rate'] = (metrics['discount_amount'] / metrics['revenue'] * 100).where(metrics['revenue'] > 0, 0)
+    
+    return metrics
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def analyze_category_trends(df: pd.DataFrame) -> pd.DataFrame:
     """
     Analyze sales trends by category.
@@ -98,22 +186,39 @@ def analyze_category_trends(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with category trends
     """
-    monthly = df.groupby([
-        df['datetime'].dt.strftime('%Y-%m'),
-        'category'
-    ]).agg({
+    month = df['datetime'].dt.to_period('M')
+    monthly = df.groupby([month, 'category'], observed=True).agg({
         'quantity': 'sum',
-        'revenue': 'sum',
-        'receipt_number': 'nunique'
-    }).reset_index()
+        'revenue': 'sum'
+    })
+    
+    # Distinct receipts per month and category from deduplicated rows,
+    # cheaper than nunique
+    orders = df[['category', 'receipt_number']].assign(datetime=month).dropna().drop_duplicates()
+    monthly['receipt_number'] = orders.groupby(['datetime', 'category'], observed=True, sort=False).size().reindex(monthly.index, fill_value=0)
+    monthly = monthly.reset_index()
+    monthly['datetime'] = monthly['datetime'].dt.strftime('%Y-%m')
+    
+    # Previous month's revenue per category from one stable sort and a
+    # boundary mask, instead of a groupby shift
+    codes = pd.factorize(monthly['category'])[0]
+    order = np.argsort(codes, kind='stable')
+    revenue = monthly['revenue'].to_numpy(dtype=float)[order]
+    same_category = codes[order][1:] == codes[order][:-1]
+    
+    prev_sorted = np.full(len(order), np.nan)
+    prev_sorted[1:][same_category] = revenue[:-1][same_category]
+    prev_revenue = np.empty_like(prev_sorted)
+    prev_revenue[order] = prev_sorted
+    monthly['prev_revenue'] = prev_revenue
     
     # Calculate growth rates
-    monthly['prev_revenue'] = monthly.groupby('category')['revenue'].shift(1)
     monthly['revenue_growth'] = ((monthly['revenue'] - monthly['prev_revenue']) / 
                                monthly['prev_revenue'] * 100)
     
     return monthly
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def find_top_combinations(df: pd.DataFrame, 
                          min_count: int = 10) -> pd.DataFrame:
     """
@@ -126,44 +231,56 @@ def find_top_combinations(df: pd.DataFrame,
     Returns:
         DataFrame with common combinations
     """
-    # Group items by receipt
-    order_items = df.groupby('receipt_number')['menu_name'].agg(list)
+    # Work on integer codes; sorted factorization keeps code order equal to
+    # name order, so names are only looked up for the final pairs
+    item_codes, item_names = pd.factorize(df['menu_name'], sort=True)
+    item_names = pd.Index(item_names).astype(str)
+    receipt_codes = pd.factorize(df['receipt_number'])[0]
+    
+    # Each item counts once per receipt; rows missing either, coded -1,
+    # belong to no receipt and would otherwise all pair up as one
+    items = pd.DataFrame({'receipt': receipt_codes, 'item': item_codes})
+    items = items[(items['receipt'] >= 0) & (items['item'] >= 0)].drop_duplicates()
     
-    combinations = []
-    for items in order_items:
-        for i, item1 in enumerate(items):
-            for item2 in items[i+1:]:
-                combinations.append(tuple(sorted([item1, item2])))
+    # Pair every item with the others on the same receipt; keeping only
+    # item_x < item_y leaves one copy of each unordered pair
+    pairs = items.merge(items, on='receipt')
+    first = pairs['item_x'].to_numpy(dtype=np.int64)
+    second = pairs['item_y'].to_numpy(dtype=np.int64)
+    ordered = first < second
     
-    # Count combinations
-    combo_counts = pd.Series(combinations).value_counts()
-    combo_df = pd.DataFrame(combo_counts[combo_counts >= min_count])
-    combo_df.columns = ['count']
-    combo_df.index = pd.MultiIndex.from_tuples(combo_df.index, 
-                                             names=['item1', 'item2'])
+    # Count combinations on a single packed int64 key per pair
+    keys, counts = np.unique(first[ordered] * len(item_names) + second[ordered],
+                             return_counts=True)
+    frequent = counts >= min_count
+    keys, counts = keys[frequent], counts[frequent]
     
-    return combo_df.reset_index()
+    return pd.DataFrame({
+        'item1': item_names[keys // len(item_names)],
+        'item2': item_names[keys % len(item_names)],
+        'count': counts
+    })
 
-def calculate_group_metrics(df: pd.DataFrame) -> pd.DataFrame:
+@st.cache_data(show_spinner=False, max_entries=16)
+def calculate_group_metrics(summary: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate metrics by group size.
     
     Args:
-        df: Sales DataFrame
+        summary: Output of summarize_sales
         
     Returns:
         DataFrame with group size metrics
     """
-    metrics = df.groupby('seat_amount').agg({
-        'summary_price': ['count', 'sum', 'mean'],
-        'receipt_number': 'nunique'
-    })
+    metrics = aggregate_sales_summary(summary, 'seat_amount')[
+        ['transaction_count', 'total_revenue', 'avg_bill']
+    ].rename(columns={'transaction_count': 'visit_count'})
     
-    metrics.columns = ['visit_count', 'total_revenue', 'avg_bill', 'unique_receipts']
     metrics['revenue_per_person'] = metrics['avg_bill'] / metrics.index
     
     return metrics.reset_index()
 
+@st.cache_data(show_spinner=False, max_entries=16)
 def analyze_discounts(df: pd.DataFrame) -> pd.DataFrame:
     """
     Analyze discount patterns.
@@ -172,21 +289,26 @@ def analyze_discounts(df: pd.DataFrame) -> pd.DataFrame:
         df: Menu sales DataFrame
         
     Returns:
-        DataFrame with discount analysis
+        DataFrame with total_discount, avg_discount, revenue, quantity and
+        discount_rate per category and menu item
     """
     # Filter for items with discounts
     discount_data = df[df['discount_amount'] > 0]
     
     if not discount_data.empty:
-        summary = discount_data.groupby(['category', 'menu_name']).agg({
-            'discount_amount': ['sum', 'mean'],
-            'revenue': 'sum',
-            'quantity': 'sum'
-        })
+        # Named aggregations give flat columns; the average comes from the
+        # sum and count instead of a separate mean pass
+        summary = discount_data.groupby(['category', 'menu_name'], observed=True, sort=False).agg(
+            total_discount=('discount_amount', 'sum'),
+            discounted_items=('discount_amount', 'count'),
+            revenue=('revenue', 'sum'),
+            quantity=('quantity', 'sum')
+        )
+        summary['avg_discount'] = summary['total_discount'] / summary.pop('discounted_items')
         
         # Add discount rate calculation
-        summary['discount_rate'] = (summary[('discount_amount', 'sum')] / 
+        summary['discount_rate'] = (summary['total_discount'] / 
                                   summary['revenue'] * 100)
         
         return summary
-    return pd.DataFrame()
\ No newline at end of file
+    return pd.DataFrame()
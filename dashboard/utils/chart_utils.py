@@ -0,0 +1,137 @@
+# foodstory-eda/dashboard/utils/chart_utils.py
+
+from html import escape
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+def lttb_indices(y: np.ndarray, n_out: int,
+                 x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Select points to plot with Largest-Triangle-Three-Buckets downsampling.
+    
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket, preserving peaks and dips.
+    
+    Args:
+        y: Series values
+        n_out: Number of points to keep
+        x: Optional numeric x positions; defaults to evenly spaced points
+    
+    Returns:
+        Sorted array of indices to keep
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        
+        area = np.abs(
+            (x[prev] - next_x) * (y[start:end] - y[prev]) -
+            (x[prev] - x[start:end]) * (next_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+    
+    return keep
+
+def downsample_series(df: pd.DataFrame, x_col: str, y_col: str,
+                      n_out: int) -> pd.DataFrame:
+    """
+    Downsample a time series frame to at most n_out rows for plotting.
+    
+    Args:
+        df: DataFrame sorted by x_col
+        x_col: Column plotted on the x axis
+        y_col: Column whose shape should be preserved
+        n_out: Maximum number of rows to keep
+    
+    Returns:
+        DataFrame with the selected rows
+    """
+    if len(df) <= n_out:
+        return df
+    
+    x = df[x_col]
+    x = x.to_numpy(dtype='datetime64[ns]').astype(np.int64) if pd.api.types.is_datetime64_any_dtype(x) else None
+    return df.iloc[lttb_indices(df[y_col].to_numpy(), n_out, x)]
+
+def histogram_bins(values: np.ndarray, bins: int,
+                   weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bin values server-side so only the bin counts are sent to the browser.
+    
+    Non-finite values are ignored.
+    
+    Args:
+        values: Values to bin
+        bins: Number of equal-width bins
+        weights: Optional weight per value, e.g. pre-aggregated counts
+    
+    Returns:
+        Tuple of (bin centers, bin widths, counts)
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[finite]
+    
+    counts, edges = np.histogram(values[finite], bins=bins, weights=weights)
+    return (edges[:-1] + edges[1:]) / 2, np.diff(edges), counts
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def render_styled_table(df: pd.DataFrame, formats: Union[str, Dict[str, str]],
+                        gradient: Optional[Dict] = None, hide_index: bool = False,
+                        height: Optional[int] = None) -> str:
+    """
+    Render a styled table to HTML once per distinct frame and styling.
+    
+    Styler formats and colours every cell on each render; caching the HTML
+    lets reruns with unchanged data skip that work entirely.
+    
+    Args:
+        df: DataFrame to render
+        formats: Format string or per-column format strings for Styler.format
+        gradient: Optional keyword arguments for Styler.background_gradient
+        hide_index: Whether to leave out the index
+        height: Optional maximum height in pixels; taller tables scroll
+    
+    Returns:
+        HTML for st.markdown(..., unsafe_allow_html=True)
+    """
+    # Cells, labels and axis names can hold text from the CSV exports and
+    # are rendered as raw HTML, so all of them are escaped
+    df = df.rename_axis(
+        index=[None if name is None else escape(str(name)) for name in df.index.names],
+        columns=[None if name is None else escape(str(name)) for name in df.columns.names]
+    )
+    styler = (df.style.format(formats, escape='html')
+              .format_index(escape='html', axis=0)
+              .format_index(escape='html', axis=1))
+    if gradient:
+        styler = styler.background_gradient(**gradient)
+    if hide_index:
+        styler = styler.hide(axis='index')
+    
+    html = styler.to_html()
+    if height:
+        html = f'<div style="max-height: {height}px; overflow: auto;">{html}</div>'
+    return html
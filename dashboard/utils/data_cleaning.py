@@ -2,13 +2,20 @@
 """
 Utility functions for cleaning and preprocessing restaurant sales data.
 """
+import numpy as np
 import pandas as pd
-from typing import Union, List
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Union, List, Tuple
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Applied in one pass by clean_column_name
+COLUMN_NAME_TRANSLATION = str.maketrans({
+    ' ': '_', '-': '_', '.': None, '(': None, ')': None
+})
+
 def clean_column_name(name: str) -> str:
     """
     Clean column names to be SQLite and Python friendly.
@@ -19,13 +26,7 @@ def clean_column_name(name: str) -> str:
     Returns:
         str: Cleaned column name
     """
-    return (name.lower()
-            .replace(' ', '_')
-            .replace('-', '_')
-            .replace('.', '')
-            .replace('(', '')
-            .replace(')', '')
-            .strip())
+    return name.lower().translate(COLUMN_NAME_TRANSLATION).strip()
 
 def clean_monetary_value(value: Union[str, float]) -> float:
     """
@@ -43,11 +44,36 @@ def clean_monetary_value(value: Union[str, float]) -> float:
         return float(value)
     return float(str(value).replace('฿', '').replace(',', '').strip() or 0)
 
+def clean_monetary_series(values: pd.Series) -> pd.Series:
+    """
+    Vectorized equivalent of clean_monetary_value for a whole column.
+    
+    Args:
+        values: Series of monetary values, as strings or numbers
+        
+    Returns:
+        pd.Series: Float series with missing values set to 0.0
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(0.0)
+    
+    # Strip currency symbols and separators in one regex pass and parse
+    # the numbers with Arrow's compute kernels, so the text never goes
+    # through Python string objects
+    text = pa.array(values, type=pa.string(), from_pandas=True)
+    stripped = pc.utf8_trim_whitespace(pc.replace_substring_regex(text, r'[฿,]', ''))
+    stripped = pc.if_else(pc.equal(stripped, ''), pa.scalar(None, pa.string()), stripped)
+    numbers = pc.cast(stripped, pa.float64()).fill_null(0.0)
+    return pd.Series(numbers.to_numpy(zero_copy_only=False), index=values.index)
+
 def clean_datetime_cols(df: pd.DataFrame, date_col: str = 'payment_date', 
                        time_col: str = 'payment_time') -> pd.Series:
     """
     Convert separate date and time columns to datetime.
     
+    Dates and times repeat heavily across receipts, so each distinct
+    value is parsed once and the results are gathered back by code.
+    
     Args:
         df: DataFrame containing the columns
         date_col: Name of the date column
@@ -57,11 +83,18 @@ def clean_datetime_cols(df: pd.DataFrame, date_col: str = 'payment_date',
         pd.Series: Combined datetime series
     """
     try:
-        return pd.to_datetime(
-            df[date_col] + ' ' + df[time_col],
-            format='%d/%m/%Y %H:%M',
-            dayfirst=True
-        )
+        date_codes, date_values = pd.factorize(df[date_col])
+        time_codes, time_values = pd.factorize(df[time_col])
+        
+        dates = pd.to_datetime(date_values, format='%d/%m/%Y').to_numpy()
+        times = (pd.to_datetime(time_values, format='%H:%M')
+                 - pd.Timestamp('1900-01-01')).to_numpy()
+        
+        # Missing values get code -1, which picks the trailing NaT
+        dates = np.append(dates, np.datetime64('NaT', 'ns'))
+        times = np.append(times, np.timedelta64('NaT', 'ns'))
+        
+        return pd.Series(dates[date_codes] + times[time_codes], index=df.index)
     except Exception as e:
         logger.error(f"Error converting datetime: {str(e)}")
         raise
@@ -89,12 +122,42 @@ def clean_monetary_columns(df: pd.DataFrame,
             'discounted_price'
         ]
     
-    df_cleaned = df.copy()
-    for col in columns:
-        if col in df_cleaned.columns:
-            df_cleaned[col] = df_cleaned[col].apply(clean_monetary_value)
+    present = [col for col in columns if col in df.columns]
+    text_cols = [col for col in present
+                 if not pd.api.types.is_numeric_dtype(df[col])]
     
-    return df_cleaned
+    cleaned = {
+        col: clean_monetary_series(df[col])
+        for col in present if col not in text_cols
+    }
+    
+    # Text columns are stacked end to end and cleaned in one pass, then
+    # split back into one column per row of the reshaped result
+    if text_cols:
+        stacked = pd.concat([df[col].astype('string') for col in text_cols],
+                            ignore_index=True)
+        values = clean_monetary_series(stacked).to_numpy().reshape(len(text_cols), len(df))
+        for col, column_values in zip(text_cols, values):
+            cleaned[col] = pd.Series(column_values, index=df.index)
+    
+    # assign replaces only the cleaned columns instead of copying the frame
+    return df.assign(**cleaned)
+
+def validate_columns(columns: List[str], required_columns: List[str]) -> bool:
+    """
+    Validate that a list of column names, e.g. a CSV header, has required columns.
+    
+    Args:
+        columns: Column names to check
+        required_columns: List of required column names
+        
+    Returns:
+        bool: True if valid, raises ValueError if not
+    """
+    missing_cols = pd.Index(list(required_columns)).difference(columns)
+    if len(missing_cols):
+        raise ValueError(f"Missing required columns: {missing_cols.tolist()}")
+    return True
 
 def validate_dataframe(df: pd.DataFrame, required_columns: List[str]) -> bool:
     """
@@ -107,10 +170,7 @@ def validate_dataframe(df: pd.DataFrame, required_columns: List[str]) -> bool:
     Returns:
         bool: True if valid, raises ValueError if not
     """
-    missing_cols = set(required_columns) - set(df.columns)
-    if missing_cols:
-        raise ValueError(f"Missing required columns: {missing_cols}")
-    return True
+    return validate_columns(df.columns, required_columns)
 
 def remove_duplicates(df: pd.DataFrame, subset: List[str] = None) -> pd.DataFrame:
     """
@@ -134,6 +194,40 @@ def remove_duplicates(df: pd.DataFrame, subset: List[str] = None) -> pd.DataFram
     
     return df_cleaned
 
+def remove_seen_duplicates(df: pd.DataFrame, seen: np.ndarray,
+                           subset: List[str] = None) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Remove rows whose key already appeared in previously loaded data.
+    
+    Used while loading several files so duplicates across files are dropped
+    before the frames are concatenated. Keys are compared by a vectorized
+    64-bit hash of their columns instead of as Python tuples; numeric key
+    columns are hashed as float64 so a code read as 19 in one file still
+    matches 19.0 in another.
+    
+    Args:
+        df: Input DataFrame
+        seen: Sorted array of key hashes already loaded
+        subset: Columns forming the key. If None, uses receipt_number
+        
+    Returns:
+        Tuple of (DataFrame without previously seen keys, updated seen hashes)
+    """
+    if subset is None:
+        subset = ['receipt_number']
+    
+    key_columns = {
+        col: df[col].astype(float) if pd.api.types.is_numeric_dtype(df[col]) else df[col]
+        for col in subset
+    }
+    keys = pd.util.hash_pandas_object(pd.DataFrame(key_columns), index=False).to_numpy()
+    mask = ~np.isin(keys, seen)
+    
+    if not mask.all():
+        logger.info(f"Removed {len(mask) - int(mask.sum()):,} records already loaded from other files")
+    
+    return df[mask], np.union1d(seen, keys[mask])
+
 def clean_group_size(df: pd.DataFrame, col: str = 'seat_amount') -> pd.DataFrame:
     """
     Clean and validate group size data.
@@ -145,15 +239,17 @@ def clean_group_size(df: pd.DataFrame, col: str = 'seat_amount') -> pd.DataFrame
     Returns:
         pd.DataFrame: DataFrame with cleaned group size
     """
-    df_cleaned = df.copy()
-    df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
+    values = pd.to_numeric(df[col], errors='coerce')
     
-    # Remove invalid group sizes (e.g., negative or unreasonably large)
-    mask = (df_cleaned[col] > 0) & (df_cleaned[col] <= 50)  # Adjust max as needed
-    invalid_count = (~mask).sum()
+    # Remove invalid group sizes (e.g., negative, fractional or unreasonably large)
+    mask = ((values > 0) & (values <= 50)  # Adjust max as needed
+            & (values % 1 == 0))
+    invalid_count = len(mask) - int(mask.sum())
     
     if invalid_count > 0:
         logger.warning(f"Found {invalid_count} invalid group sizes")
-        df_cleaned.loc[~mask, col] = None
     
-    return df_cleaned
\ No newline at end of file
+    # where keeps the column numeric with NaN for invalid sizes; group sizes
+    # are small whole numbers, so store them as nullable Int16. assign
+    # replaces only this column instead of copying the frame.
+    return df.assign(**{col: values.where(mask).astype('Int16')})
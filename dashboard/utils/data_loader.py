@@ -3,121 +3,220 @@
 import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, Optional, Sequence, Union
 from pathlib import Path
 import streamlit as st
 
+# Datetimes are stored as INTEGER milliseconds since the Unix epoch
+DB_DATETIME_UNIT = 'ms'
+
+# Sales columns read by the dashboard pages; all are in idx_sales_datetime_cover
+SALES_COLUMNS = ('datetime', 'seat_amount', 'summary_price')
+
+# SELECT expression for each loadable sales_detail column. Missing values
+# and numeric types are resolved by SQLite while reading, so no per-column
+# cleanup pass is needed afterwards.
+MENU_COLUMN_EXPRESSIONS = {
+    'datetime': "datetime",
+    'receipt_number': "receipt_number",
+    'menu_code': "COALESCE(CAST(menu_code AS INTEGER), 0)",
+    'menu_name': "menu_name",
+    'category': "COALESCE(category, 'Uncategorized')",
+    'quantity': "CAST(COALESCE(quantity, 0) AS REAL)",
+    'price_per_unit': "CAST(COALESCE(price_per_unit, 0) AS REAL)",
+    'summary_price': "CAST(COALESCE(summary_price, 0) AS REAL)",
+    'revenue': "CAST(COALESCE(revenue, 0) AS REAL)",
+    'discount_amount': "CAST(COALESCE(discount_amount, 0) AS REAL)",
+}
+
+# Menu columns read by the menu analysis page
+MENU_COLUMNS = ('datetime', 'receipt_number', 'menu_code', 'menu_name',
+                'category', 'quantity', 'revenue', 'discount_amount')
+
 def get_db_path() -> Path:
     """Get the path to the SQLite database."""
     return Path(__file__).parent.parent.parent / 'database' / 'restaurant_sales.db'
 
+@st.cache_resource(show_spinner=False)
+def get_connection() -> sqlite3.Connection:
+    """
+    Get the shared database connection.
+    
+    One connection is reused by every loader and session, so SQLite's
+    page cache stays warm between queries instead of starting cold.
+    
+    Returns:
+        sqlite3.Connection usable from any Streamlit thread
+    """
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False)
+    conn.execute('PRAGMA cache_size = -200000')  # ~200 MB page cache
+    conn.execute('PRAGMA mmap_size = 268435456')  # 256 MB memory-mapped reads
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+def _to_epoch_ms(timestamp: pd.Timestamp) -> int:
+    """Convert a timestamp to the stored epoch milliseconds."""
+    return (timestamp - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+
+def _read_date_filtered(query: str, start_date: Optional[datetime],
+                        end_date: Optional[datetime]) -> pd.DataFrame:
+    """
+    Run a loader query restricted to an optional date range.
+    
+    Datetimes are stored as epoch milliseconds, so both bounds are
+    compared as integers and the end date is applied as an exclusive
+    bound on the following day. The SQL text only varies with which
+    bounds are set, so the sqlite3 statement cache on the shared
+    connection reuses the compiled statements.
+    
+    Args:
+        query: SELECT over a table with a datetime column, ending in a
+            WHERE clause the date conditions can be appended to
+        start_date: Optional start date for filtering
+        end_date: Optional end date for filtering
+    
+    Returns:
+        DataFrame with the datetime column, if selected, parsed
+    """
+    params = []
+    if start_date:
+        query += " AND datetime >= ?"
+        params.append(_to_epoch_ms(pd.Timestamp(start_date).normalize()))
+    if end_date:
+        query += " AND datetime < ?"
+        params.append(_to_epoch_ms(pd.Timestamp(end_date).normalize() + timedelta(days=1)))
+    
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    
+    if 'datetime' in df:
+        df['datetime'] = pd.to_datetime(df['datetime'], unit=DB_DATETIME_UNIT)
+    
+    return df
+
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False)
 def load_sales_data(start_date: Optional[datetime] = None,
-                   end_date: Optional[datetime] = None) -> pd.DataFrame:
+                   end_date: Optional[datetime] = None,
+                   columns: Union[Sequence[str], str, None] = None) -> pd.DataFrame:
     """
     Load sales data from database with optional date filtering.
     
     Args:
         start_date: Optional start date for filtering
         end_date: Optional end date for filtering
+        columns: Columns to load, or '*' for all. Defaults to SALES_COLUMNS,
+            which SQLite can answer from idx_sales_datetime_cover alone.
         
     Returns:
         DataFrame with sales data
     """
-    query = """
-    SELECT *
+    if columns is None:
+        columns = SALES_COLUMNS
+    if columns == '*':
+        select = '*'
+    else:
+        select = ', '.join('"{}"'.format(col.replace('"', '""')) for col in columns)
+    
+    query = f"""
+    SELECT {select}
     FROM sales
     WHERE 1=1
     """
+    df = _read_date_filtered(query, start_date, end_date)
     
-    params = []
-    if start_date:
-        query += " AND datetime >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND datetime <= ?"
-        params.append(end_date)
+    # Group sizes are small whole numbers; float32 keeps NULLs as NaN
+    if 'seat_amount' in df:
+        df['seat_amount'] = pd.to_numeric(df['seat_amount'], downcast='float')
     
-    with sqlite3.connect(get_db_path()) as conn:
-        df = pd.read_sql_query(query, conn, params=params)
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        
     return df
 
-def load_menu_data(start_date: Optional[datetime] = None,
-                  end_date: Optional[datetime] = None) -> pd.DataFrame:
-    """
-    Load detailed menu sales data from database with improved error handling.
-    """
-    query = """
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False)
+def _load_menu_data(start_date: Optional[datetime],
+                    end_date: Optional[datetime],
+                    columns: Sequence[str]) -> pd.DataFrame:
+    """Cached body of load_menu_data; database errors propagate uncached."""
+    select = ',\n        '.join(f"{MENU_COLUMN_EXPRESSIONS[col]} as {col}" for col in columns)
+    query = f"""
     SELECT 
-        sd.*,
-        COALESCE(sd.summary_price, 0) as revenue,
-        COALESCE(sd.discount_by_item, 0) as discount_amount
-    FROM sales_detail sd
+        {select}
+    FROM sales_detail
     WHERE 1=1
     """
+    df = _read_date_filtered(query, start_date, end_date)
     
-    params = []
-    if start_date:
-        query += " AND sd.datetime >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND sd.datetime <= ?"
-        params.append(end_date)
+    # Narrow dtypes for the analysis groupbys: whole-number columns
+    # downcast losslessly, and repeated labels become categoricals.
+    # Monetary columns stay float64 so totals keep full precision.
+    for col in df.columns.intersection(['quantity', 'menu_code']):
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.columns.intersection(['menu_name', 'category', 'receipt_number']):
+        df[col] = df[col].astype('category')
     
+    return df
+
+def load_menu_data(start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None,
+                  columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Load detailed menu sales data from database with improved error handling.
+    
+    Args:
+        start_date: Optional start date for filtering
+        end_date: Optional end date for filtering
+        columns: Columns to load, from MENU_COLUMN_EXPRESSIONS.
+            Defaults to MENU_COLUMNS.
+        
+    Returns:
+        DataFrame with menu sales data
+    """
+    if columns is None:
+        columns = MENU_COLUMNS
+    unknown = set(columns) - set(MENU_COLUMN_EXPRESSIONS)
+    if unknown:
+        raise ValueError(f"Unknown menu data columns: {unknown}")
+    
+    # Only database errors are reported as load failures; anything else
+    # is a bug and should surface as such. Failures are caught outside
+    # the cache so the next rerun tries the database again.
     try:
-        with sqlite3.connect(get_db_path()) as conn:
-            df = pd.read_sql_query(query, conn, params=params)
-            
-            # Convert datetime
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            
-            # Remove duplicate columns if they exist
-            df = df.loc[:, ~df.columns.duplicated()]
-            
-            # Convert numeric columns
-            numeric_columns = ['quantity', 'price_per_unit', 'summary_price', 
-                             'discounted_price', 'revenue', 'discount_amount']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-            # Ensure menu_code is not null and is numeric
-            if 'menu_code' in df.columns:
-                df['menu_code'] = pd.to_numeric(df['menu_code'], errors='coerce').fillna(0)
-            
-            # Ensure category is not null
-            df['category'] = df['category'].fillna('Uncategorized')
-            
-            return df
-    except Exception as e:
+        return _load_menu_data(start_date, end_date, tuple(columns))
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
         st.error(f"Error loading menu data: {str(e)}")
         return pd.DataFrame()
 
-def load_category_summary() -> pd.DataFrame:
-    """
-    Load category-level summary data with improved error handling.
-    """
+@st.cache_data(ttl=3600, show_spinner=False)
+def _load_category_summary() -> pd.DataFrame:
+    """Cached body of load_category_summary; database errors propagate uncached."""
+    # Rows without a menu code are stored as code 0, which is not an item
     query = """
     SELECT 
         COALESCE(category, 'Uncategorized') as category,
-        COUNT(DISTINCT menu_code) as unique_items,
-        SUM(COALESCE(quantity, 0)) as total_quantity,
-        SUM(COALESCE(summary_price, 0)) as total_revenue,
-        SUM(COALESCE(discount_amount, 0)) as total_discount
-    FROM sales_detail
+        COUNT(DISTINCT NULLIF(menu_code, 0)) as unique_items,
+        SUM(COALESCE(total_quantity, 0)) as total_quantity,
+        SUM(COALESCE(net_revenue, 0)) as total_revenue,
+        SUM(COALESCE(total_discount, 0)) as total_discount
+    FROM menu_summary
     GROUP BY category
     HAVING category IS NOT NULL
     """
     
+    with get_connection() as conn:
+        return pd.read_sql_query(query, conn)
+
+def load_category_summary() -> pd.DataFrame:
+    """
+    Load category-level summary data with improved error handling.
+    
+    Reads the per-item totals in menu_summary, written at ingest time,
+    rather than aggregating every row of sales_detail.
+    """
     try:
-        with sqlite3.connect(get_db_path()) as conn:
-            df = pd.read_sql_query(query, conn)
-            return df
-    except Exception as e:
+        return _load_category_summary()
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
         st.error(f"Error loading category summary: {str(e)}")
         return pd.DataFrame()  # Return empty DataFrame instead of raising
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_monthly_trends(category: Optional[str] = None) -> pd.DataFrame:
     """
     Load monthly sales trends with optional category filtering.
@@ -128,12 +227,13 @@ def load_monthly_trends(category: Optional[str] = None) -> pd.DataFrame:
     Returns:
         DataFrame with monthly trends
     """
+    # Rows without a menu code are stored as code 0, which is not an item
     query = """
     SELECT 
         year_month,
         SUM(quantity) as total_quantity,
         SUM(revenue) as total_revenue,
-        COUNT(DISTINCT menu_code) as unique_items
+        COUNT(DISTINCT NULLIF(menu_code, 0)) as unique_items
     FROM monthly_summary
     """
     
@@ -144,34 +244,50 @@ def load_monthly_trends(category: Optional[str] = None) -> pd.DataFrame:
     
     query += " GROUP BY year_month ORDER BY year_month"
     
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         return pd.read_sql_query(query, conn, params=params)
 
 def get_date_range() -> Tuple[datetime, datetime]:
     """
     Get the full date range available in the database.
     
+    The result is cached per database modification time, so Streamlit
+    reruns reuse it until the database is re-ingested.
+    
     Returns:
         Tuple of (min_date, max_date)
     """
+    return _query_date_range(get_db_path().stat().st_mtime)
+
+@st.cache_data(show_spinner=False)
+def _query_date_range(db_mtime: float) -> Tuple[datetime, datetime]:
+    """Query the date range; db_mtime only serves as the cache key."""
     query = """
     SELECT MIN(datetime), MAX(datetime)
     FROM sales
     """
     
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         result = pd.read_sql_query(query, conn)
-        return (pd.to_datetime(result.iloc[0, 0]),
-                pd.to_datetime(result.iloc[0, 1]))
+        return (pd.to_datetime(result.iloc[0, 0], unit=DB_DATETIME_UNIT),
+                pd.to_datetime(result.iloc[0, 1], unit=DB_DATETIME_UNIT))
 
 def get_categories() -> list:
     """
     Get list of all menu categories.
     
+    Like get_date_range, the result is cached per database modification
+    time, so it is only queried again after the database is re-ingested.
+    
     Returns:
         List of category names
     """
+    return _query_categories(get_db_path().stat().st_mtime)
+
+@st.cache_data(show_spinner=False)
+def _query_categories(db_mtime: float) -> list:
+    """Query the categories; db_mtime only serves as the cache key."""
     query = "SELECT DISTINCT category FROM menu_summary ORDER BY category"
     
-    with sqlite3.connect(get_db_path()) as conn:
+    with get_connection() as conn:
         return pd.read_sql_query(query, conn)['category'].tolist()
\ No newline at end of file
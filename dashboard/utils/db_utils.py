@@ -9,17 +9,48 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# Rows per executemany batch in to_sql; pandas builds the row tuples one
+# batch at a time, so this bounds their memory on large files
+INSERT_CHUNKSIZE = 50_000
+
+def to_epoch_ms(values: pd.Series) -> pd.Series:
+    """
+    Convert datetimes to the stored format: INTEGER milliseconds since the
+    Unix epoch.
+    
+    Args:
+        values: Datetime Series; NaT becomes NULL
+        
+    Returns:
+        pd.Series: Nullable Int64 Series
+    """
+    return ((values - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).astype('Int64')
+
 class DatabaseConnection:
-    """Context manager for database connections."""
+    """
+    Context manager for database connections.
+    
+    With bulk_load=True the connection skips fsyncs, keeps its rollback
+    journal and temp tables in memory and uses a large page cache. Writes
+    are much faster, but a crash mid-load can leave the file corrupt, so
+    use it only for ingest runs that can simply be repeated.
+    """
     
-    def __init__(self, db_path: Union[str, Path]):
+    def __init__(self, db_path: Union[str, Path], bulk_load: bool = False):
         self.db_path = Path(db_path)
+        self.bulk_load = bulk_load
         
     def __enter__(self) -> sqlite3.Connection:
         if not self.db_path.parent.exists():
             raise FileNotFoundError(f"Database directory does not exist: {self.db_path.parent}")
         
         self.conn = sqlite3.connect(self.db_path)
+        if self.bulk_load:
+            # Per-connection settings; they end when the connection closes
+            self.conn.execute('PRAGMA synchronous = OFF')
+            self.conn.execute('PRAGMA journal_mode = MEMORY')
+            self.conn.execute('PRAGMA temp_store = MEMORY')
+            self.conn.execute('PRAGMA cache_size = -200000')  # ~200 MB for index builds
         return self.conn
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -93,7 +124,8 @@ def safe_write_to_db(df: pd.DataFrame, db_path: Union[str, Path],
     """
     try:
         with DatabaseConnection(db_path) as conn:
-            df.to_sql(table_name, conn, if_exists=if_exists, index=index)
+            df.to_sql(table_name, conn, if_exists=if_exists, index=index,
+                      chunksize=INSERT_CHUNKSIZE)
             logger.info(f"Successfully wrote {len(df):,} rows to {table_name}")
     except Exception as e:
         logger.error(f"Error writing to database: {str(e)}")
@@ -0,0 +1,273 @@
+# foodstory-eda/dashboard/utils/ingest_utils.py
+"""
+Shared helpers for the CSV ingest scripts.
+"""
+import csv
+import hashlib
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from tqdm import tqdm
+
+from dashboard.utils import data_cleaning
+from dashboard.utils.data_cleaning import remove_seen_duplicates, validate_columns
+
+logger = logging.getLogger(__name__)
+
+# Encodings the POS system is known to export, in order of preference
+CSV_ENCODINGS = ['utf-8', 'cp1252']
+
+def sniff_encoding(file_path: Path, sample_size: int = 4096) -> str:
+    """
+    Guess a CSV file's encoding from its first few kilobytes.
+    
+    Args:
+        file_path: Path to CSV file
+        sample_size: Number of bytes to inspect
+    
+    Returns:
+        str: 'utf-8' if the sample is valid UTF-8 (with or without a byte
+        order mark), otherwise 'cp1252'
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size)
+    
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is fine
+        if not (e.reason == 'unexpected end of data' and len(sample) == sample_size):
+            return 'cp1252'
+    return 'utf-8'
+
+def read_csv_header(file_path: Path, encoding: str) -> List[str]:
+    """
+    Read only the header row of a CSV file.
+    
+    Args:
+        file_path: Path to CSV file
+        encoding: Text encoding; a UTF-8 byte order mark is skipped
+    
+    Returns:
+        List[str]: Column names, empty for an empty file
+    """
+    if encoding == 'utf-8':
+        encoding = 'utf-8-sig'
+    with open(file_path, newline='', encoding=encoding) as f:
+        return next(csv.reader(f), [])
+
+def read_csv_file(file_path: Path, dtype: Optional[Dict] = None,
+                  required_columns: Optional[Iterable[str]] = None,
+                  rename: Optional[Callable[[str], str]] = None) -> pd.DataFrame:
+    """
+    Read a CSV export in the encoding sniffed from its first bytes.
+    
+    The other known encodings are only tried if the whole file turns out
+    not to decode, so a file is normally parsed once. Malformed CSV is
+    raised rather than retried in another encoding.
+    
+    Files are parsed with Arrow's multithreaded CSV reader. Columns given a
+    string dtype are read as Arrow strings directly; the others are inferred,
+    except that dates and times are kept as text, as pd.read_csv does.
+    
+    Args:
+        file_path: Path to CSV file
+        dtype: Optional column dtypes, as for pd.read_csv; columns missing
+            from the file are skipped
+        required_columns: Optional columns the file must have. They are
+            checked against the header, so an invalid file is rejected
+            before its data is parsed.
+        rename: Optional function applied to every column name. The Arrow
+            table is renamed before it is converted, so the DataFrame is
+            built with its final column labels.
+    
+    Returns:
+        pd.DataFrame: Raw CSV data
+    """
+    dtype = dtype or {}
+    column_types = {
+        col: pa.string() for col, col_dtype in dtype.items()
+        if pd.api.types.is_string_dtype(col_dtype)
+    }
+    
+    # Arrow skips a UTF-8 byte order mark itself, so utf-8-sig needs no
+    # separate attempt
+    sniffed = sniff_encoding(file_path)
+    encodings = [sniffed] + [enc for enc in CSV_ENCODINGS if enc != sniffed]
+    for encoding in encodings:
+        if required_columns is not None:
+            try:
+                header = read_csv_header(file_path, encoding)
+            except UnicodeDecodeError:
+                continue
+            validate_columns(header, required_columns)
+        
+        read_options = pa_csv.ReadOptions(encoding=encoding)
+        # Quoted fields such as remarks may span lines
+        parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+        try:
+            table = pa_csv.read_csv(
+                file_path, read_options=read_options,
+                parse_options=parse_options,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=column_types, strings_can_be_null=True
+                )
+            )
+        except UnicodeDecodeError:
+            continue
+        except pa.ArrowInvalid as e:
+            # The encoding is only sniffed from the first bytes; text that
+            # is not valid UTF-8 further on fails in the string columns
+            if 'invalid UTF8' not in str(e):
+                raise
+            continue
+        
+        # Text that is not valid in this encoding is inferred as binary
+        if any(pa.types.is_binary(field.type) for field in table.schema):
+            continue
+        
+        # Dates and times in columns without a string dtype are inferred as
+        # temporal types. They are cast back to text in Arrow's ISO form
+        # rather than parsing the file again, so columns whose exact text
+        # matters should be given a string dtype.
+        for i, field in enumerate(table.schema):
+            if pa.types.is_temporal(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+        
+        if rename is not None:
+            table = table.rename_columns([rename(name) for name in table.column_names])
+            dtype = {rename(col): col_dtype for col, col_dtype in dtype.items()}
+        
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        
+        # As with pd.read_csv, dtypes for columns the file lacks are ignored
+        dtype = {col: col_dtype for col, col_dtype in dtype.items() if col in df.columns}
+        return df.astype(dtype) if dtype else df
+    raise ValueError(f"Could not read file with any encoding: {file_path}")
+
+@lru_cache(maxsize=None)
+def _cleaning_fingerprint(module_name: str) -> str:
+    """Hash of the code that cleans a file, so edits to it invalidate the cache."""
+    digest = hashlib.md5()
+    for module in (sys.modules[module_name], sys.modules[__name__], data_cleaning):
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+def get_cache_path(file_path: Path, cache_dir: Path,
+                   process_file: Callable[[Path], Optional[pd.DataFrame]]) -> Path:
+    """
+    Cache location for a cleaned CSV.
+    
+    Keyed on the file's path, size and mtime, and on the source of the
+    cleaning code, so cached frames are rebuilt once the cleaning changes.
+    """
+    stat = file_path.stat()
+    fingerprint = _cleaning_fingerprint(process_file.__module__)
+    key = hashlib.md5(
+        f"{fingerprint}:{file_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    ).hexdigest()
+    return cache_dir / f"{file_path.stem}_{key[:12]}.parquet"
+
+def process_cached(file_path: Path,
+                   process_file: Callable[[Path], Optional[pd.DataFrame]],
+                   cache_dir: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """
+    Process a CSV file, reusing the cleaned result from a previous run if cached.
+    
+    Args:
+        file_path: Path to CSV file
+        process_file: Function that reads and cleans a single file
+        cache_dir: Directory for cached Parquet files, or None to disable
+    
+    Returns:
+        Optional[pd.DataFrame]: Processed DataFrame or None if error
+    """
+    if cache_dir is None:
+        return process_file(file_path)
+    
+    cache_path = get_cache_path(file_path, cache_dir, process_file)
+    if cache_path.exists():
+        logger.info(f"Loading cached: {file_path.name}")
+        return pd.read_parquet(cache_path)
+    
+    df = process_file(file_path)
+    if df is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(cache_path, index=False)
+        except Exception as e:
+            logger.warning(f"Could not cache {file_path.name}: {str(e)}")
+    return df
+
+def iter_csv_data(path: Path,
+                  process_file: Callable[[Path], Optional[pd.DataFrame]],
+                  duplicate_key: Optional[List[str]] = None,
+                  cache_dir: Optional[Path] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield cleaned CSV data one file at a time, in file name order.
+    
+    Files are parsed and cleaned in worker processes, so the pandas string
+    work runs on every core, but only a few are held in memory at once.
+    Callers that write each frame out before taking the next keep peak
+    memory at a handful of files rather than the whole directory.
+    
+    Args:
+        path: Path to CSV file or directory
+        process_file: Function that reads and cleans a single file
+        duplicate_key: Columns identifying a record across files.
+            If None, uses receipt_number
+        cache_dir: Optional directory for cached cleaned data
+    
+    Yields:
+        pd.DataFrame: Cleaned data of one file, without records already
+        yielded from earlier files
+    """
+    if not path.is_dir():
+        df = process_cached(path, process_file, cache_dir)
+        if df is None:
+            raise ValueError(f"Failed to process file: {path}")
+        yield df
+        return
+    
+    csv_files = sorted(path.glob('*.csv'))
+    if not csv_files:
+        raise ValueError(f"No CSV files found in directory: {path}")
+    
+    logger.info(f"Found {len(csv_files)} CSV files")
+    seen = np.empty(0, dtype=np.uint64)
+    processed = 0
+    workers = os.cpu_count() or 1
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep one file in flight per worker; results come back in order.
+        # process_file must be a module-level function so it can be pickled.
+        pending = deque()
+        files = iter(csv_files)
+        for file in islice(files, workers):
+            pending.append(executor.submit(process_cached, file, process_file, cache_dir))
+        
+        with tqdm(total=len(csv_files), desc="Processing files") as progress:
+            while pending:
+                df = pending.popleft().result()
+                for file in islice(files, 1):
+                    pending.append(executor.submit(process_cached, file, process_file, cache_dir))
+                progress.update()
+                
+                if df is not None:
+                    processed += 1
+                    df, seen = remove_seen_duplicates(df, seen, duplicate_key)
+                    yield df
+    
+    if not processed:
+        raise ValueError("No valid data was processed from any files")
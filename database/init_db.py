@@ -12,6 +12,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Table definitions shared with the ingest scripts
+SCHEMA_DIR = Path(__file__).parent / 'schemas'
+
 def get_db_path() -> Path:
     """Get the database path."""
     return Path(__file__).parent / 'restaurant_sales.db'
@@ -33,7 +36,7 @@ def init_db():
         logger.info("Creating sales table...")
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS sales (
-            datetime TIMESTAMP NOT NULL,
+            datetime INTEGER NOT NULL,
             receipt_number TEXT PRIMARY KEY,
             payment_type TEXT,
             table_number TEXT,
@@ -56,7 +59,7 @@ def init_db():
         logger.info("Creating sales_detail table...")
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS sales_detail (
-            datetime TIMESTAMP NOT NULL,
+            datetime INTEGER NOT NULL,
             receipt_number TEXT,
             menu_code INTEGER,
             menu_name TEXT,
@@ -76,44 +79,20 @@ def init_db():
         )
         """)
         
-        # Create menu_summary table
-        logger.info("Creating menu_summary table...")
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS menu_summary (
-            menu_code INTEGER PRIMARY KEY,
-            menu_name TEXT NOT NULL,
-            category TEXT,
-            total_quantity REAL,
-            total_revenue REAL,
-            total_discount REAL,
-            times_ordered INTEGER
-        )
-        """)
-        
-        # Create monthly_summary table
-        logger.info("Creating monthly_summary table...")
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS monthly_summary (
-            year_month TEXT,
-            menu_code INTEGER,
-            menu_name TEXT,
-            category TEXT,
-            quantity REAL,
-            revenue REAL,
-            discount_amount REAL,
-            orders INTEGER,
-            PRIMARY KEY (year_month, menu_code),
-            FOREIGN KEY (menu_code) REFERENCES menu_summary(menu_code)
-        )
-        """)
+        # Create the summary tables from the schema the ingest also uses
+        logger.info("Creating menu_summary and monthly_summary tables...")
+        cursor.executescript((SCHEMA_DIR / 'menu.sql').read_text(encoding='utf-8'))
         
         # Create indices
         logger.info("Creating indices...")
         
         # Sales indices
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_datetime ON sales(datetime)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_payment_type ON sales(payment_type)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_branch ON sales(branch)")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sales_datetime_cover
+        ON sales(datetime, seat_amount, summary_price)
+        """)
         
         # Sales detail indices
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_detail_datetime ON sales_detail(datetime)")
@@ -121,13 +100,6 @@ def init_db():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_detail_menu ON sales_detail(menu_code)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_detail_category ON sales_detail(category)")
         
-        # Menu summary indices
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_menu_category ON menu_summary(category)")
-        
-        # Monthly summary indices
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_monthly_year_month ON monthly_summary(year_month)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_monthly_category ON monthly_summary(category)")
-        
         conn.commit()
         logger.info("Database initialization completed successfully!")
         
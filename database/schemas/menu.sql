@@ -1,13 +1,16 @@
--- Menu summary table schema
+-- Menu summary table schema; one row per menu item as named and
+-- categorised in sales_detail, with missing menu codes stored as 0
 CREATE TABLE IF NOT EXISTS menu_summary (
-    menu_code INTEGER PRIMARY KEY,
-    menu_name TEXT NOT NULL,
+    menu_code INTEGER,
+    menu_name TEXT,
     category TEXT,
     total_quantity REAL,
     total_revenue REAL,
     total_discount REAL,
-    times_ordered INTEGER
-);
+    times_ordered INTEGER,
+    net_revenue REAL,
+    PRIMARY KEY (menu_code, menu_name, category)
+) WITHOUT ROWID, STRICT;
 
 -- Create indices for menu_summary table
 CREATE INDEX IF NOT EXISTS idx_menu_category ON menu_summary(category);
@@ -22,10 +25,8 @@ CREATE TABLE IF NOT EXISTS monthly_summary (
     revenue REAL,
     discount_amount REAL,
     orders INTEGER,
-    PRIMARY KEY (year_month, menu_code),
-    FOREIGN KEY (menu_code) REFERENCES menu_summary(menu_code)
-);
+    PRIMARY KEY (year_month, menu_code, menu_name, category)
+) WITHOUT ROWID, STRICT;
 
--- Create indices for monthly_summary table
-CREATE INDEX IF NOT EXISTS idx_monthly_year_month ON monthly_summary(year_month);
+-- Create indices for monthly_summary table; year_month lookups use the primary key
 CREATE INDEX IF NOT EXISTS idx_monthly_category ON monthly_summary(category);
\ No newline at end of file
@@ -1,6 +1,6 @@
 -- Sales table schema
 CREATE TABLE IF NOT EXISTS sales (
-    datetime TIMESTAMP NOT NULL,
+    datetime INTEGER NOT NULL,
     receipt_number TEXT PRIMARY KEY,
     payment_type TEXT,
     table_number TEXT,
@@ -19,13 +19,14 @@ CREATE TABLE IF NOT EXISTS sales (
 );
 
 -- Create indices for sales table
-CREATE INDEX IF NOT EXISTS idx_sales_datetime ON sales(datetime);
 CREATE INDEX IF NOT EXISTS idx_sales_payment_type ON sales(payment_type);
 CREATE INDEX IF NOT EXISTS idx_sales_branch ON sales(branch);
+CREATE INDEX IF NOT EXISTS idx_sales_datetime_cover
+    ON sales(datetime, seat_amount, summary_price);
 
 -- Sales detail table schema
 CREATE TABLE IF NOT EXISTS sales_detail (
-    datetime TIMESTAMP NOT NULL,
+    datetime INTEGER NOT NULL,
     receipt_number TEXT,
     menu_code INTEGER,
     menu_name TEXT,
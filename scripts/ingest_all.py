@@ -0,0 +1,89 @@
+# foodstory-eda/dashboard/scripts/ingest_all.py
+
+import sys
+from pathlib import Path
+import argparse
+import logging
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from dashboard.utils.db_utils import DatabaseConnection, validate_db_path
+from scripts.ingest_bills import create_sales_indices, write_sales
+from scripts.ingest_details import (
+    create_indices, create_summary_tables, write_sales_detail
+)
+
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load bill and detailed bill data into SQLite in one run'
+    )
+    parser.add_argument('bills_path', type=Path,
+                       help='Path to bill CSV file or directory')
+    parser.add_argument('details_path', type=Path,
+                       help='Path to detailed bill CSV file or directory')
+    parser.add_argument('--db', type=Path,
+                       default=Path('database/restaurant_sales.db'),
+                       help='Path for the SQLite database')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                       help='Cache cleaned CSVs here to skip re-parsing unchanged files')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Enable verbose output')
+    
+    args = parser.parse_args()
+    
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler('ingest_all.log', encoding='utf-8')
+        ]
+    )
+    
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    
+    try:
+        # Validate inputs
+        for path in (args.bills_path, args.details_path):
+            if not path.exists():
+                raise FileNotFoundError(f"Input path does not exist: {path}")
+        
+        validate_db_path(args.db)
+        
+        # Ensure database directory exists
+        args.db.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Both tables are written over one connection, so its bulk-load
+        # settings and page cache carry over from one phase to the next,
+        # and indices are only built once all rows are in
+        with DatabaseConnection(args.db, bulk_load=True) as conn:
+            sales_rows = write_sales(conn, args.bills_path, args.cache_dir)
+            detail_rows = write_sales_detail(conn, args.details_path, args.cache_dir)
+            
+            # Create summary tables
+            create_summary_tables(conn)
+            
+            # Create indices
+            create_sales_indices(conn)
+            create_indices(conn)
+        
+        logger.info("\nIngestion complete!")
+        logger.info(f"Sales rows: {sales_rows:,}")
+        logger.info(f"Sales detail rows: {detail_rows:,}")
+        
+        return 0
+    
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        if args.verbose:
+            logger.exception("Full traceback:")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
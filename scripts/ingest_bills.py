@@ -1,13 +1,11 @@
 # foodstory-eda/dashboard/scripts/ingest_bills.py
 
 import sys
-import os
 from pathlib import Path
 import argparse
 import logging
 import pandas as pd
-from glob import glob
-from typing import Optional
+from typing import Iterator, Optional
 import sqlite3
 
 # Add project root to Python path
@@ -17,25 +15,30 @@ sys.path.append(str(project_root))
 from dashboard.utils.data_cleaning import (
     clean_column_name, clean_monetary_columns,
     clean_datetime_cols, remove_duplicates,
-    clean_group_size, validate_dataframe
+    clean_group_size
 )
+from dashboard.utils.ingest_utils import iter_csv_data, read_csv_file
 from dashboard.utils.db_utils import (
-    DatabaseConnection, create_indices,
-    validate_db_path, safe_write_to_db
-)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('ingest_bills.log', encoding='utf-8')
-    ]
+    DatabaseConnection, INSERT_CHUNKSIZE, to_epoch_ms, validate_db_path
 )
 
 logger = logging.getLogger(__name__)
 
+# Text columns are read straight into Arrow-backed strings, skipping type
+# inference and keeping them out of Python object arrays
+CSV_DTYPES = {
+    'Payment Date': 'string[pyarrow]',
+    'Payment Time': 'string[pyarrow]',
+    'Receipt Number': 'string[pyarrow]',
+    'Table': 'string[pyarrow]',
+}
+
+# Columns a file must have to be ingested
+REQUIRED_COLUMNS = {
+    'Payment Date', 'Payment Time', 'Receipt Number',
+    'Summary Price', 'Seat Amount'
+}
+
 def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
     """
     Process a single CSV file of bill data.
@@ -49,25 +52,10 @@ def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
     try:
         logger.info(f"Processing: {file_path.name}")
         
-        # Try different encodings
-        for encoding in ['utf-8', 'utf-8-sig', 'cp1252']:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        else:
-            raise ValueError(f"Could not read file with any encoding: {file_path}")
-        
-        # Validate required columns
-        required_columns = {
-            'Payment Date', 'Payment Time', 'Receipt Number',
-            'Summary Price', 'Seat Amount'
-        }
-        validate_dataframe(df, required_columns)
-        
-        # Clean column names
-        df.columns = [clean_column_name(col) for col in df.columns]
+        # Required columns are checked on the header, before parsing the
+        # data; column names are cleaned before the DataFrame is built
+        df = read_csv_file(file_path, CSV_DTYPES, REQUIRED_COLUMNS,
+                           rename=clean_column_name)
         
         # Convert datetime
         df['datetime'] = clean_datetime_cols(df)
@@ -88,65 +76,101 @@ def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
         logger.error(f"Error processing {file_path}: {str(e)}")
         return None
 
-def load_and_clean_data(path: Path) -> pd.DataFrame:
+def iter_and_clean_data(path: Path, cache_dir: Optional[Path] = None) -> Iterator[pd.DataFrame]:
     """
-    Load and clean bill data from file or directory.
+    Load and clean bill data from file or directory, one file at a time.
     
     Args:
         path: Path to CSV file or directory
+        cache_dir: Optional directory for cached cleaned data
         
     Returns:
-        pd.DataFrame: Cleaned and combined data
+        Iterator[pd.DataFrame]: Cleaned data per file, without duplicates
+        of earlier files
     """
-    if path.is_dir():
-        csv_files = list(path.glob('*.csv'))
-        if not csv_files:
-            raise ValueError(f"No CSV files found in directory: {path}")
-            
-        logger.info(f"Found {len(csv_files)} CSV files")
-        all_data = []
-        
-        for file in csv_files:
-            df = process_csv_file(file)
-            if df is not None:
-                all_data.append(df)
-        
-        if not all_data:
-            raise ValueError("No valid data was processed from any files")
-            
-        df = pd.concat(all_data, ignore_index=True)
-        logger.info(f"Total records loaded: {len(df):,}")
-        
-    else:
-        df = process_csv_file(path)
-        if df is None:
-            raise ValueError(f"Failed to process file: {path}")
-            
-    return df
+    return iter_csv_data(path, process_csv_file, cache_dir=cache_dir)
+
 
 def create_sales_indices(conn: sqlite3.Connection) -> None:
     """Create indices for the sales table."""
     try:
         cursor = conn.cursor()
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_datetime ON sales(datetime)')
+        
+        # Build every index in one transaction, committed once at the end
+        cursor.execute('BEGIN')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_receipt ON sales(receipt_number)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_payment ON sales(payment_type)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_seats ON sales(seat_amount)')
+        
+        # Covers the dashboard's date-range query, so it never reads the
+        # table; its datetime prefix also serves plain datetime lookups
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sales_datetime_cover
+            ON sales(datetime, seat_amount, summary_price)
+        ''')
+        
+        # Refresh planner statistics after the bulk load
+        cursor.execute('ANALYZE')
         conn.commit()
     except sqlite3.Error as e:
         logger.error(f"Error creating index: {str(e)}")
         raise
 
+def write_sales(conn: sqlite3.Connection, path: Path,
+                cache_dir: Optional[Path] = None) -> int:
+    """
+    Clean bill data and write it to the sales table, replacing its contents.
+    
+    Each file is written as soon as it is cleaned, so only a few files are
+    in memory at once. Indices are left to create_sales_indices.
+    
+    Args:
+        conn: Database connection
+        path: Path to CSV file or directory
+        cache_dir: Optional directory for cached cleaned data
+        
+    Returns:
+        int: Number of rows written
+    """
+    total_rows = 0
+    if_exists = 'replace'
+    for df in iter_and_clean_data(path, cache_dir):
+        # Files are read in name order and each is stored sorted by
+        # datetime, so the dashboard's date range scans mostly read
+        # neighbouring pages instead of jumping around
+        df = df.sort_values('datetime', kind='stable', ignore_index=True)
+        df['datetime'] = to_epoch_ms(df['datetime'])
+        df.to_sql('sales', conn, if_exists=if_exists, index=False,
+                  chunksize=INSERT_CHUNKSIZE)
+        if_exists = 'append'
+        total_rows += len(df)
+    
+    logger.info(f"Wrote {total_rows:,} records to sales")
+    return total_rows
+
 def main():
     parser = argparse.ArgumentParser(description='Load restaurant bill data into SQLite')
     parser.add_argument('path', type=Path, help='Path to CSV file or directory')
     parser.add_argument('--db', type=Path, default=Path('database/restaurant_sales.db'),
                        help='Path for the SQLite database')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                       help='Cache cleaned CSVs here to skip re-parsing unchanged files')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose output')
     
     args = parser.parse_args()
     
+    # Configured here rather than on import, so ingest_all can reuse the
+    # helpers without creating this script's log file
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler('ingest_bills.log', encoding='utf-8')
+        ]
+    )
+    
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
@@ -157,16 +181,11 @@ def main():
             
         validate_db_path(args.db)
         
-        # Process data
-        df = load_and_clean_data(args.path)
-        
         # Ensure database directory exists
         args.db.parent.mkdir(parents=True, exist_ok=True)
         
-        # Write to database
-        with DatabaseConnection(args.db) as conn:
-            logger.info(f"Writing {len(df):,} records to database")
-            df.to_sql('sales', conn, if_exists='replace', index=False)
+        with DatabaseConnection(args.db, bulk_load=True) as conn:
+            total_rows = write_sales(conn, args.path, args.cache_dir)
             
             # Create indices
             create_sales_indices(conn)
@@ -176,11 +195,14 @@ def main():
             cursor.execute('SELECT COUNT(DISTINCT receipt_number) FROM sales')
             unique_receipts = cursor.fetchone()[0]
             
-            cursor.execute('SELECT MIN(datetime), MAX(datetime) FROM sales')
+            cursor.execute(
+                "SELECT datetime(MIN(datetime) / 1000, 'unixepoch'), "
+                "datetime(MAX(datetime) / 1000, 'unixepoch') FROM sales"
+            )
             date_range = cursor.fetchone()
             
         logger.info("\nIngestion complete!")
-        logger.info(f"Total rows: {len(df):,}")
+        logger.info(f"Total rows: {total_rows:,}")
         logger.info(f"Unique receipts: {unique_receipts:,}")
         logger.info(f"Date range: {date_range[0]} to {date_range[1]}")
         
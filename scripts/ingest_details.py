@@ -1,13 +1,11 @@
 # foodstory-eda/dashboard/scripts/ingest_details.py
 
 import sys
-import os
 from pathlib import Path
 import argparse
 import logging
 import pandas as pd
-from typing import Optional, Dict, Any
-from tqdm import tqdm
+from typing import Iterator, Optional
 import sqlite3
 
 # Add project root to Python path
@@ -16,26 +14,38 @@ sys.path.append(str(project_root))
 
 from dashboard.utils.data_cleaning import (
     clean_column_name, clean_monetary_columns,
-    clean_datetime_cols, remove_duplicates,
-    validate_dataframe
+    clean_datetime_cols, remove_duplicates
 )
+from dashboard.utils.ingest_utils import iter_csv_data, read_csv_file
 from dashboard.utils.db_utils import (
-    DatabaseConnection, create_indices,
-    validate_db_path, table_exists
-)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('ingest_details.log', encoding='utf-8')
-    ]
+    DatabaseConnection, INSERT_CHUNKSIZE, to_epoch_ms, validate_db_path
 )
 
 logger = logging.getLogger(__name__)
 
+# Text columns are read straight into Arrow-backed strings, skipping type
+# inference and keeping them out of Python object arrays
+CSV_DTYPES = {
+    'Payment Date': 'string[pyarrow]',
+    'Payment Time': 'string[pyarrow]',
+    'Receipt Number': 'string[pyarrow]',
+    'Menu Name': 'string[pyarrow]',
+    'Category': 'string[pyarrow]',
+}
+
+# Columns a file must have to be ingested
+REQUIRED_COLUMNS = {
+    'Payment Date', 'Payment Time', 'Receipt Number',
+    'Menu Code', 'Menu Name', 'Quantity',
+    'Price per unit', 'Summary Price', 'Category'
+}
+
+# Definition of menu_summary and monthly_summary, shared with init_db
+SUMMARY_SCHEMA = project_root / 'database' / 'schemas' / 'menu.sql'
+
+# Columns identifying a single line item across files
+DUPLICATE_KEY = ['receipt_number', 'menu_code', 'menu_name', 'datetime']
+
 def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
     """
     Process a single CSV file of detailed bill data.
@@ -49,26 +59,10 @@ def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
     try:
         logger.info(f"Processing: {file_path.name}")
         
-        # Try different encodings
-        for encoding in ['utf-8', 'utf-8-sig', 'cp1252']:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        else:
-            raise ValueError(f"Could not read file with any encoding: {file_path}")
-        
-        # Validate required columns
-        required_columns = {
-            'Payment Date', 'Payment Time', 'Receipt Number',
-            'Menu Code', 'Menu Name', 'Quantity',
-            'Price per unit', 'Summary Price', 'Category'
-        }
-        validate_dataframe(df, required_columns)
-        
-        # Clean column names
-        df.columns = [clean_column_name(col) for col in df.columns]
+        # Required columns are checked on the header, before parsing the
+        # data; column names are cleaned before the DataFrame is built
+        df = read_csv_file(file_path, CSV_DTYPES, REQUIRED_COLUMNS,
+                           rename=clean_column_name)
         
         # Convert datetime
         df['datetime'] = clean_datetime_cols(df)
@@ -89,7 +83,7 @@ def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
         df['discount_amount'] = df['revenue'] - df['summary_price']
         
         # Remove duplicates
-        df = remove_duplicates(df, ['receipt_number', 'menu_code', 'menu_name', 'datetime'])
+        df = remove_duplicates(df, DUPLICATE_KEY)
         
         logger.info(f"Successfully processed {len(df):,} records from {file_path.name}")
         return df
@@ -98,111 +92,127 @@ def process_csv_file(file_path: Path) -> Optional[pd.DataFrame]:
         logger.error(f"Error processing {file_path}: {str(e)}")
         return None
 
-def create_summary_tables(df: pd.DataFrame, conn: sqlite3.Connection) -> None:
+def create_summary_tables(conn: sqlite3.Connection) -> None:
     """
-    Create summary tables from detailed sales data.
+    Create summary tables from the detailed sales data in the database.
+    
+    Both summaries are aggregated by SQLite straight from sales_detail, so
+    the detail rows never have to be held in memory at once. Missing menu
+    codes are stored as 0, as load_menu_data reads them, so those rows
+    still count towards their category; rows without a datetime only
+    count towards the menu totals.
+    
+    The tables are created from SUMMARY_SCHEMA, the same definition
+    init_db uses, and rebuilt in a single transaction, so they are
+    committed once and readers never see them dropped or half filled.
     
     Args:
-        df: Processed sales detail DataFrame
         conn: Database connection
     """
-    # Menu summary
-    logger.info("Creating menu summary table...")
-    menu_summary = df.groupby(['menu_code', 'menu_name', 'category']).agg({
-        'quantity': 'sum',
-        'revenue': 'sum',
-        'discount_amount': 'sum',
-        'receipt_number': 'count'
-    }).reset_index()
-    
-    menu_summary.columns = [
-        'menu_code', 'menu_name', 'category',
-        'total_quantity', 'total_revenue',
-        'total_discount', 'times_ordered'
-    ]
-    
-    menu_summary.to_sql('menu_summary', conn, if_exists='replace', index=False)
-    
-    # Monthly summary
-    logger.info("Creating monthly summary table...")
-    monthly_summary = df.groupby([
-        df['datetime'].dt.strftime('%Y-%m'),
-        'menu_code',
-        'menu_name',
-        'category'
-    ]).agg({
-        'quantity': 'sum',
-        'revenue': 'sum',
-        'discount_amount': 'sum',
-        'receipt_number': 'nunique'
-    }).reset_index()
-    
-    monthly_summary.columns = [
-        'year_month', 'menu_code', 'menu_name', 'category',
-        'quantity', 'revenue', 'discount_amount', 'orders'
-    ]
-    
-    monthly_summary.to_sql('monthly_summary', conn, if_exists='replace', index=False)
+    logger.info("Creating menu and monthly summary tables...")
+    schema = SUMMARY_SCHEMA.read_text(encoding='utf-8')
+    conn.executescript(f"""
+        BEGIN;
+        DROP TABLE IF EXISTS menu_summary;
+        DROP TABLE IF EXISTS monthly_summary;
+        {schema};
+        INSERT INTO menu_summary
+        SELECT
+            COALESCE(CAST(menu_code AS INTEGER), 0), menu_name, category,
+            COALESCE(SUM(quantity), 0),
+            COALESCE(SUM(revenue), 0),
+            COALESCE(SUM(discount_amount), 0),
+            COUNT(receipt_number),
+            COALESCE(SUM(summary_price), 0)
+        FROM sales_detail
+        GROUP BY COALESCE(CAST(menu_code AS INTEGER), 0), menu_name, category;
+        -- Datetimes are stored as epoch milliseconds
+        INSERT INTO monthly_summary
+        SELECT
+            strftime('%Y-%m', datetime / 1000, 'unixepoch'),
+            COALESCE(CAST(menu_code AS INTEGER), 0), menu_name, category,
+            COALESCE(SUM(quantity), 0),
+            COALESCE(SUM(revenue), 0),
+            COALESCE(SUM(discount_amount), 0),
+            COUNT(DISTINCT receipt_number)
+        FROM sales_detail
+        WHERE datetime IS NOT NULL
+        GROUP BY strftime('%Y-%m', datetime / 1000, 'unixepoch'),
+            COALESCE(CAST(menu_code AS INTEGER), 0), menu_name, category;
+        COMMIT;
+    """)
 
 def create_indices(conn: sqlite3.Connection) -> None:
     """Create all necessary indices."""
     try:
         cursor = conn.cursor()
         
+        # Build every index in one transaction, committed once at the end
+        cursor.execute('BEGIN')
+        
         # Sales detail indices
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_detail_datetime ON sales_detail(datetime)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_detail_receipt ON sales_detail(receipt_number)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_detail_menu ON sales_detail(menu_code)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_detail_category ON sales_detail(category)')
         
-        # Menu summary indices
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_menu_code ON menu_summary(menu_code)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_category_summary ON menu_summary(category)')
+        # Summary table indices come with SUMMARY_SCHEMA
         
-        # Monthly summary indices
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_year_month ON monthly_summary(year_month)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_menu_monthly ON monthly_summary(menu_code)')
+        # Refresh planner statistics after the bulk load
+        cursor.execute('ANALYZE')
         
         conn.commit()
     except sqlite3.Error as e:
         logger.error(f"Error creating index: {str(e)}")
         raise
 
-def load_and_clean_data(path: Path) -> pd.DataFrame:
+def iter_and_clean_data(path: Path, cache_dir: Optional[Path] = None) -> Iterator[pd.DataFrame]:
     """
-    Load and clean detailed bill data from file or directory.
+    Load and clean detailed bill data from file or directory, one file at a time.
     
     Args:
         path: Path to CSV file or directory
+        cache_dir: Optional directory for cached cleaned data
         
     Returns:
-        pd.DataFrame: Cleaned and combined data
+        Iterator[pd.DataFrame]: Cleaned data per file, without duplicates
+        of earlier files
     """
-    if path.is_dir():
-        csv_files = list(path.glob('*.csv'))
-        if not csv_files:
-            raise ValueError(f"No CSV files found in directory: {path}")
-            
-        logger.info(f"Found {len(csv_files)} CSV files")
-        all_data = []
-        
-        for file in tqdm(csv_files, desc="Processing files"):
-            df = process_csv_file(file)
-            if df is not None:
-                all_data.append(df)
-        
-        if not all_data:
-            raise ValueError("No valid data was processed from any files")
-            
-        df = pd.concat(all_data, ignore_index=True)
-        logger.info(f"Total records loaded: {len(df):,}")
+    return iter_csv_data(path, process_csv_file, DUPLICATE_KEY, cache_dir)
+
+def write_sales_detail(conn: sqlite3.Connection, path: Path,
+                       cache_dir: Optional[Path] = None) -> int:
+    """
+    Clean detailed bill data and write it to the sales_detail table,
+    replacing its contents.
+    
+    Each file is written as soon as it is cleaned, so only a few files are
+    in memory at once. Summary tables and indices are left to
+    create_summary_tables and create_indices.
+    
+    Args:
+        conn: Database connection
+        path: Path to CSV file or directory
+        cache_dir: Optional directory for cached cleaned data
         
-    else:
-        df = process_csv_file(path)
-        if df is None:
-            raise ValueError(f"Failed to process file: {path}")
+    Returns:
+        int: Number of rows written
+    """
+    total_rows = 0
+    if_exists = 'replace'
+    for df in iter_and_clean_data(path, cache_dir):
+        # Files are read in name order and each is stored sorted by
+        # datetime, so the dashboard's date range scans mostly read
+        # neighbouring pages instead of jumping around
+        df = df.sort_values('datetime', kind='stable', ignore_index=True)
+        df['datetime'] = to_epoch_ms(df['datetime'])
+        df.to_sql('sales_detail', conn, if_exists=if_exists, index=False,
+                  chunksize=INSERT_CHUNKSIZE)
+        if_exists = 'append'
+        total_rows += len(df)
     
-    return df
+    logger.info(f"Wrote {total_rows:,} records to sales_detail")
+    return total_rows
 
 def main():
     parser = argparse.ArgumentParser(
@@ -213,11 +223,24 @@ def main():
     parser.add_argument('--db', type=Path,
                        default=Path('database/restaurant_sales.db'),
                        help='Path to SQLite database')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                       help='Cache cleaned CSVs here to skip re-parsing unchanged files')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose output')
     
     args = parser.parse_args()
     
+    # Configured here rather than on import, so ingest_all can reuse the
+    # helpers without creating this script's log file
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler('ingest_details.log', encoding='utf-8')
+        ]
+    )
+    
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
@@ -234,16 +257,11 @@ def main():
         
         validate_db_path(args.db)
         
-        # Process data
-        df = load_and_clean_data(args.path)
-        
-        # Update database
-        with DatabaseConnection(args.db) as conn:
-            logger.info(f"Writing {len(df):,} records to database")
-            df.to_sql('sales_detail', conn, if_exists='replace', index=False)
+        with DatabaseConnection(args.db, bulk_load=True) as conn:
+            write_sales_detail(conn, args.path, args.cache_dir)
             
             # Create summary tables
-            create_summary_tables(df, conn)
+            create_summary_tables(conn)
             
             # Create indices
             create_indices(conn)
@@ -256,7 +274,10 @@ def main():
             cursor.execute('SELECT COUNT(DISTINCT category) FROM sales_detail')
             unique_categories = cursor.fetchone()[0]
             
-            cursor.execute('SELECT MIN(datetime), MAX(datetime) FROM sales_detail')
+            cursor.execute(
+                "SELECT datetime(MIN(datetime) / 1000, 'unixepoch'), "
+                "datetime(MAX(datetime) / 1000, 'unixepoch') FROM sales_detail"
+            )
             date_range = cursor.fetchone()
         
         logger.info("\nIngestion complete!")